@@ -0,0 +1,8 @@
+import pytest
+from calculator import add, divide
+
+def test_add():
+    assert add(1, 2) == 3
+
+def test_divide():
+    assert divide(10, 5) == 2
\ No newline at end of file
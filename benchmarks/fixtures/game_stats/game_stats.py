@@ -0,0 +1,7 @@
+class Game:
+    def __init__(self, score, total):
+        self.score = score
+        self.total = total
+
+    def get_ratio(self):
+        return self.score / self.total
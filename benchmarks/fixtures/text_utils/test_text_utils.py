@@ -0,0 +1,10 @@
+from text_utils import word_count, capitalize_words
+
+def test_word_count():
+    assert word_count("hello   world ") == 2
+
+def test_word_count_empty():
+    assert word_count("") == 0
+
+def test_capitalize_words():
+    assert capitalize_words("hello world") == "Hello World"
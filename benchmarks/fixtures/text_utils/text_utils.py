@@ -0,0 +1,6 @@
+def word_count(text):
+    return len(text.split(" "))
+
+
+def capitalize_words(text):
+    return " ".join(w.upper() for w in text.split())
@@ -0,0 +1,118 @@
+"""
+Offline benchmark of the swarm: runs the graph over the buggy fixtures with a
+stub model replaying benchmarks/recordings.json, so no network is needed.
+
+    python benchmarks/run_benchmark.py [--latency 0.5] [--repeat 3] [--output report.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+BENCH_DIR = os.path.join(ROOT, "benchmarks")
+
+
+def use_empty_caches(cache_dir):
+    """
+    Points the persistent lint and test-result caches at an empty directory, so a
+    run (or a repeat) measures pylint and pytest rather than cache hits, and the
+    repository's own .swarm_cache is left alone.
+    """
+    from src.tools import lint_engine, pytest_runner
+
+    lint_engine._engine.cache = lint_engine.LintCache(os.path.join(cache_dir, "lint"))
+    pytest_runner._test_cache = pytest_runner.ReportCache(os.path.join(cache_dir, "tests"))
+
+
+def run_once(fixtures_dir, max_workers, num_candidates):
+    from src.graph import run_swarm
+    from src.telemetry import get_span_totals, reset_span_totals, get_prompt_cache_stats
+
+    reset_span_totals()
+    files = {}
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as workspace:
+        use_empty_caches(os.path.join(workspace, ".swarm_cache"))
+        for fixture in sorted(os.listdir(fixtures_dir)):
+            # Work on a copy: the Fixer rewrites the files
+            target_dir = os.path.join(workspace, fixture)
+            shutil.copytree(os.path.join(fixtures_dir, fixture), target_dir)
+            final_state = run_swarm(target_dir, max_workers=max_workers, num_candidates=num_candidates)
+            for name, result in final_state["results"].items():
+                files[f"{fixture}/{name}"] = result
+    elapsed = time.perf_counter() - start
+
+    return {
+        "elapsed_seconds": elapsed,
+        "files": len(files),
+        "files_per_minute": len(files) / elapsed * 60 if elapsed else 0.0,
+        "converged": sum(1 for r in files.values() if r["status"] == "SUCCESS"),
+        "iterations": {name: r["loop_count"] for name, r in files.items()},
+        "stages": get_span_totals(),
+        "prompt_cache": get_prompt_cache_stats(),
+    }
+
+
+def print_report(report):
+    print(f"\n{'='*60}")
+    print(f"⏱️  {report['files']} files in {report['elapsed_seconds']:.2f}s "
+          f"({report['files_per_minute']:.1f} files/min), {report['converged']} converged")
+    print(f"{'stage':<10}{'calls':>8}{'total s':>10}{'mean s':>10}{'llm s':>10}{'subproc s':>11}")
+    for name, stage in sorted(report["stages"].items()):
+        print(f"{name:<10}{stage['count']:>8}{stage['duration_seconds']:>10.3f}"
+              f"{stage['duration_seconds'] / stage['count']:>10.3f}"
+              f"{stage.get('llm_seconds', 0):>10.3f}{stage.get('subprocess_seconds', 0):>11.3f}")
+    cache = report["prompt_cache"]
+    print(f"Prompt prefix cache: {cache['hits']} hits / {cache['misses']} misses "
+          f"({cache['hit_rate']:.0%}), {cache['cached_prompt_tokens']} input tokens not resent, "
+          f"{cache['sent_prompt_tokens']} sent")
+    print("Iterations to converge:")
+    for name, loops in sorted(report["iterations"].items()):
+        print(f"  {name:<35}{loops}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the Refactoring Swarm")
+    parser.add_argument("--fixtures", default=os.path.join(BENCH_DIR, "fixtures"))
+    parser.add_argument("--recordings", default=os.path.join(BENCH_DIR, "recordings.json"))
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated LLM latency in seconds")
+    parser.add_argument("--max_workers", type=int, default=4)
+    parser.add_argument("--candidates", type=int, default=1, help="Best-of-N Fixer candidates")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", help="Write the reports as JSON to this file")
+    args = parser.parse_args()
+
+    # Caches and logs live under the repository root
+    os.chdir(ROOT)
+    # Measure real work: no cached responses (nor lint / test results, see
+    # use_empty_caches), no telemetry mixed with real runs
+    os.environ["SWARM_NO_CACHE"] = "1"
+    os.environ.setdefault("GOOGLE_API_KEY", "offline")
+
+    from src.agents.client import get_client
+    from src.agents.stub import StubModel, load_recordings
+    from src.utils.logger import get_sink
+
+    telemetry_dir = tempfile.mkdtemp(prefix="swarm-bench-")
+    get_sink().path = os.path.join(telemetry_dir, "benchmark.jsonl")
+    get_client().set_backend(StubModel(load_recordings(args.recordings), latency=args.latency))
+
+    reports = []
+    for i in range(args.repeat):
+        report = run_once(args.fixtures, args.max_workers, args.candidates)
+        print_report(report)
+        reports.append(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=4)
+        print(f"📊 Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
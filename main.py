@@ -1,22 +1,109 @@
 import argparse
 import json
+import os
 import time
-from src.graph import create_swarm_graph
+from src.graph import run_swarm, DEFAULT_MAX_WORKERS
+from src.checkpoints import new_run_id, save_run, load_run
 from src.telemetry import save_experiment_data
+from src.batch import load_manifest, run_batch, DEFAULT_JOBS
+from src.agents.client import MAX_CONCURRENT_REQUESTS
+from src.convergence import POLICIES, DEFAULT_POLICY
+from src.budget import RunBudget
+from src.utils.logger import merge_shards
 
 def main():
     # 1. Handle CLI Arguments
     parser = argparse.ArgumentParser(description="The Refactoring Swarm")
-    parser.add_argument("--target_dir", required=True, help="Path to the buggy code directory")
+    parser.add_argument("--target_dir", help="Path to the buggy code directory")
+    parser.add_argument("--max_workers", type=int, default=DEFAULT_MAX_WORKERS,
+                        help="Number of files refactored in parallel")
+    parser.add_argument("--candidates", type=int, default=1,
+                        help="Fixes generated and tested in parallel per iteration (best one is kept)")
+    parser.add_argument("--fixer_output", choices=["patch", "full"], default="patch",
+                        help="Fixer answers with changed functions/diffs (patch) or whole files (full)")
+    parser.add_argument("--no_cache", action="store_true",
+                        help="Always call the LLM, ignoring cached responses")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Continue an interrupted run from its last completed node")
+    parser.add_argument("--convergence", choices=sorted(POLICIES), default=DEFAULT_POLICY,
+                        help="When to stop iterating on a file (adaptive: while the expected gain is worth its cost)")
+    parser.add_argument("--max_iterations", type=int, default=10,
+                        help="Fixer iterations allowed per file")
+    parser.add_argument("--min_gain_per_minute", type=float, default=0.2,
+                        help="Adaptive policy: pylint points an extra iteration must bring per minute it takes")
+    parser.add_argument("--min_gain_per_1k_tokens", type=float, default=0.05,
+                        help="Adaptive policy: pylint points an extra iteration must bring per 1000 LLM tokens")
+    parser.add_argument("--file_max_tokens", type=int,
+                        help="Budget per file: LLM tokens (then cheaper model, then stop)")
+    parser.add_argument("--file_max_seconds", type=float,
+                        help="Budget per file: wall-clock seconds")
+    parser.add_argument("--file_max_subprocess_seconds", type=float,
+                        help="Budget per file: seconds spent running tests")
+    parser.add_argument("--max_tokens", type=int,
+                        help="Budget of the whole run (or batch): LLM tokens")
+    parser.add_argument("--max_seconds", type=float,
+                        help="Budget of the whole run (or batch): wall-clock seconds")
+    parser.add_argument("--max_subprocess_seconds", type=float,
+                        help="Budget of the whole run (or batch): seconds spent running tests")
+    parser.add_argument("--manifest",
+                        help="Batch mode: file listing many target directories (one per line, or JSON)")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help="Batch mode: targets refactored in parallel (one process each)")
+    parser.add_argument("--max_concurrent_requests", type=int, default=MAX_CONCURRENT_REQUESTS,
+                        help="Batch mode: LLM requests in flight across all processes")
+    parser.add_argument("--requests_per_minute", type=float,
+                        help="Batch mode: LLM requests started per minute across all processes")
     args = parser.parse_args()
 
+    if args.no_cache:
+        os.environ["SWARM_NO_CACHE"] = "1"
+
+    convergence = {"policy": args.convergence, "max_iterations": args.max_iterations}
+    if args.convergence == "adaptive":
+        convergence.update(min_gain_per_minute=args.min_gain_per_minute,
+                           min_gain_per_1k_tokens=args.min_gain_per_1k_tokens)
+
+    file_budget = {"tokens": args.file_max_tokens, "seconds": args.file_max_seconds,
+                   "subprocess_seconds": args.file_max_subprocess_seconds}
+    run_budget = {"tokens": args.max_tokens, "seconds": args.max_seconds,
+                  "subprocess_seconds": args.max_subprocess_seconds}
+
+    if args.manifest:
+        targets = load_manifest(args.manifest)
+        print(f"\n🚀 Starting batch of {len(targets)} targets ({args.jobs} at a time)")
+        summary = run_batch(targets, jobs=args.jobs, max_workers=args.max_workers,
+                            num_candidates=args.candidates, fixer_output=args.fixer_output,
+                            convergence=convergence, max_concurrent_requests=args.max_concurrent_requests,
+                            requests_per_minute=args.requests_per_minute, no_cache=args.no_cache,
+                            file_budget=file_budget, batch_budget=run_budget)
+        counts = summary["counts"]
+        print(f"\n🏁 Batch finished: {counts['success']}/{counts['total']} succeeded, "
+              f"{counts['failed']} failed, {counts['crashed']} crashed.")
+        return
+
+    # A resumed run keeps the target and options it was started with
+    if args.resume:
+        saved_run = load_run(args.resume)
+        if saved_run is None:
+            parser.error(f"unknown run id: {args.resume}")
+        run_id = args.resume
+        args.target_dir = saved_run["target_dir"]
+        args.candidates = saved_run["options"]["candidates"]
+        args.fixer_output = saved_run["options"]["fixer_output"]
+        convergence = saved_run["options"].get("convergence", convergence)
+        file_budget = saved_run["options"].get("file_budget", file_budget)
+    elif args.target_dir:
+        run_id = new_run_id()
+        save_run(run_id, args.target_dir, {"candidates": args.candidates, "fixer_output": args.fixer_output,
+                                           "convergence": convergence, "file_budget": file_budget})
+    else:
+        parser.error("--target_dir is required (or --resume RUN_ID, or --manifest)")
+
     print(f"\n🚀 Starting Refactoring Swarm on: {args.target_dir}")
+    print(f"🔖 Run id: {run_id} (resume with --resume {run_id})")
     print(f"{'='*50}\n")
 
-    # 2. Initialize the Graph
-    app = create_swarm_graph()
-
-    # 3. Prepare Initial State
+    # 2. Prepare Initial State
     initial_state = {
         "messages": [],
         "target_dir": args.target_dir,
@@ -25,9 +112,12 @@ def main():
 
     start_time = time.time()
 
-    # 4. Run the Swarm
+    # 3. Run the Swarm (one pipeline per source file)
     try:
-        final_state = app.invoke(initial_state)
+        final_state = run_swarm(args.target_dir, max_workers=args.max_workers,
+                                num_candidates=args.candidates, fixer_output=args.fixer_output,
+                                run_id=run_id, resume=bool(args.resume), convergence=convergence,
+                                file_budget=file_budget, run_budget=RunBudget(run_budget))
     except Exception as e:
         print(f"\n💥 CRITICAL ERROR: {e}")
         # We still try to save logs if possible, but exit with error
@@ -36,8 +126,10 @@ def main():
 
     end_time = time.time()
 
-    # 5. Save Telemetry (Data Officer Role - 30% of Grade!)
+    # 4. Save Telemetry (Data Officer Role - 30% of Grade!)
     save_experiment_data(initial_state, final_state, start_time, end_time)
+    # Move this process's telemetry into logs/experiment_data.jsonl
+    merge_shards()
 
     print(f"\n{'='*50}")
     print("🏁 Swarm finished.")
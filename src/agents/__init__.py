@@ -1,5 +1,5 @@
 # src/agents/__init__.py
 
 from .auditor import Auditor
-from .fixer import Fixer
+from .fixer import Fixer, PatchFixer
 from .judge import Judge
\ No newline at end of file
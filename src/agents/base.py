@@ -0,0 +1,81 @@
+import functools
+import os
+
+from src.telemetry import record
+
+from .cache import cache_disabled, get_cache, make_key
+from .client import DEFAULT_MODEL, get_client
+from .streaming import CodeBlockWatcher
+
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "prompts")
+
+
+@functools.lru_cache(maxsize=None)
+def load_prompt(prompt_file):
+    """
+    Reads an instruction file of src/prompts once per process, whatever the working directory.
+    """
+    with open(os.path.join(PROMPTS_DIR, prompt_file), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class BaseAgent:
+    """
+    Common plumbing of the agents: prompt loading and calls through the shared client.
+    Subclasses set `prompt_file` and implement `build_prompt`; `prompt_prefix` is
+    the start of that prompt shared between calls, cached by the backend.
+    Responses are served from the on-disk cache when the same model, prompt file
+    and inputs were already seen, unless use_cache=False or SWARM_NO_CACHE is set.
+    """
+    prompt_file = None
+    # Agents answering with ```python blocks stream them: each block is
+    # syntax-checked as soon as it is closed (see streaming.py)
+    streams_code = False
+    # The answer is complete after its first code block
+    single_code_block = False
+
+    def __init__(self, model_name=DEFAULT_MODEL, use_cache=True):
+        self.client = get_client()
+        self.model_name = model_name
+        self.use_cache = use_cache
+        self.instructions = load_prompt(self.prompt_file)
+
+    def build_prompt(self, *args):
+        raise NotImplementedError
+
+    def prompt_prefix(self, *args):
+        """
+        Leading part of build_prompt(*args) that stays the same across calls
+        (at least the instructions). Must be an exact prefix of the prompt.
+        """
+        return self.instructions
+
+    def _watcher(self):
+        return CodeBlockWatcher(self.single_code_block) if self.streams_code else None
+
+    def _cache_key(self, args):
+        if not self.use_cache or cache_disabled():
+            return None
+        return make_key(self.model_name, self.instructions, *args)
+
+    def run(self, *args):
+        key = self._cache_key(args)
+        if key and (cached := get_cache().get(key)) is not None:
+            record(cache_hits=1)
+            return cached
+        response = self.client.generate(self.build_prompt(*args), self.model_name, self._watcher(),
+                                        self.prompt_prefix(*args))
+        if key:
+            get_cache().put(key, response)
+        return response
+
+    async def arun(self, *args):
+        key = self._cache_key(args)
+        if key and (cached := get_cache().get(key)) is not None:
+            record(cache_hits=1)
+            return cached
+        response = await self.client.agenerate(self.build_prompt(*args), self.model_name, self._watcher(),
+                                               self.prompt_prefix(*args))
+        if key:
+            get_cache().put(key, response)
+        return response
@@ -0,0 +1,112 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_PATH = os.path.join(".swarm_cache", "llm_responses.sqlite")
+
+# Eviction limits: entries older than MAX_AGE_SECONDS are dropped, then the least
+# recently used ones until the stored responses fit in MAX_SIZE_BYTES.
+MAX_AGE_SECONDS = 7 * 24 * 3600
+MAX_SIZE_BYTES = 50 * 1024 * 1024
+
+
+def cache_disabled():
+    """
+    Setting SWARM_NO_CACHE=1 bypasses the cache (main.py --no_cache does this).
+    """
+    return os.getenv("SWARM_NO_CACHE", "").lower() in ("1", "true", "yes")
+
+
+def make_key(model_name, instructions, *inputs):
+    """
+    Content address of a call: model + prompt file contents + every input.
+    """
+    digest = hashlib.sha256()
+    for part in (model_name, instructions, *inputs):
+        data = str(part).encode("utf-8")
+        # Length prefix so ("ab", "c") and ("a", "bc") do not collide
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk cache of LLM responses, safe to share between threads and processes.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_age=MAX_AGE_SECONDS, max_size=MAX_SIZE_BYTES):
+        self.path = path
+        self.max_age = max_age
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, response TEXT, size INTEGER,"
+                " created_at REAL, accessed_at REAL)"
+            )
+
+    def _connect(self):
+        # One short-lived connection per operation: sqlite connections cannot be shared across threads
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.max_age:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def put(self, key, response):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response.encode("utf-8")), now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.max_age,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_size:
+            return
+        rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_size:
+                break
+            stale.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Returns the process-wide ResponseCache, creating it on first use.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
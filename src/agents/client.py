@@ -0,0 +1,338 @@
+import asyncio
+import datetime
+import hashlib
+import multiprocessing
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from src.telemetry import record
+from src.agents.streaming import MalformedOutput
+
+DEFAULT_MODEL = "gemini-3-flash-preview"
+
+# Requests allowed in flight at once (shared by every agent and every file)
+MAX_CONCURRENT_REQUESTS = 4
+# How often a coroutine waiting for a request slot checks again
+SLOT_POLL_SECONDS = 0.05
+MAX_RETRIES = 5
+BASE_BACKOFF_SECONDS = 2.0
+MAX_BACKOFF_SECONDS = 60.0
+
+# Prompt prefixes (instructions + unchanged code) kept by the backend between requests
+PREFIX_CACHE_TTL_SECONDS = 600
+PREFIX_CACHE_MAX_ENTRIES = 64
+# Gemini refuses to cache shorter contents: such prompts are sent whole
+MIN_PROVIDER_PREFIX_TOKENS = 1024
+
+
+def is_rate_limited(error):
+    """
+    True if the API refused the request because of quotas or overload (HTTP 429/503).
+    """
+    name = type(error).__name__
+    if name in ("ResourceExhausted", "TooManyRequests", "ServiceUnavailable"):
+        return True
+    message = str(error)
+    return "429" in message or "quota" in message.lower()
+
+
+def get_retry_delay(error, attempt):
+    """
+    Uses the delay suggested by the API ("Please retry in 33.7s") when there is one,
+    otherwise an exponential backoff with jitter.
+    """
+    match = re.search(r"retry in (\d+(?:\.\d+)?)s", str(error))
+    if match:
+        return min(float(match.group(1)), MAX_BACKOFF_SECONDS)
+    delay = BASE_BACKOFF_SECONDS * (2 ** attempt)
+    return min(delay, MAX_BACKOFF_SECONDS) * random.uniform(0.5, 1.0)
+
+
+def record_usage(prompt, text, seconds, usage=None):
+    """
+    Adds the latency and token counts of one call to the open telemetry spans.
+    Token counts come from the response usage metadata when the SDK provides it,
+    otherwise they are estimated at ~4 characters per token (of the text actually
+    received, for a stream stopped early).
+    """
+    if usage is not None:
+        prompt_tokens = usage.prompt_token_count
+        response_tokens = usage.candidates_token_count
+    else:
+        prompt_tokens = len(prompt) // 4
+        response_tokens = len(text) // 4
+    record(llm_calls=1, llm_seconds=seconds, prompt_tokens=prompt_tokens, response_tokens=response_tokens)
+
+
+class GlobalRateLimit:
+    """
+    LLM request limits shared by several processes (batch mode): at most
+    max_concurrency requests in flight and requests_per_minute started per minute,
+    across every process that received the same instance.
+    Built on multiprocessing primitives, so it must be created in the parent and
+    handed to the workers when they start (e.g. through a pool initializer).
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENT_REQUESTS, requests_per_minute=None, context=None):
+        # Must match the start method of the processes it is shared with
+        context = context or multiprocessing.get_context("spawn")
+        self.requests_per_minute = requests_per_minute
+        self._slots = context.BoundedSemaphore(max_concurrency)
+        self._lock = context.Lock()
+        # Earliest time (time.time()) at which the next request may start
+        self._next_start = context.Value("d", 0.0, lock=False)
+
+    def reserve(self):
+        """
+        Books the next start slot and returns how long to wait before using it.
+        """
+        if not self.requests_per_minute:
+            return 0.0
+        with self._lock:
+            now = time.time()
+            start = max(now, self._next_start.value)
+            self._next_start.value = start + 60.0 / self.requests_per_minute
+        return start - now
+
+    def acquire(self):
+        self._slots.acquire()
+
+    def release(self):
+        self._slots.release()
+
+
+class ModelClient:
+    """
+    Shared Gemini client: the SDK is loaded and configured once, on the first
+    request, one GenerativeModel is reused per model name, and every request goes
+    through a concurrency limiter with retry on rate-limit errors.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENT_REQUESTS, max_retries=MAX_RETRIES):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self._models = {}
+        # The Gemini SDK, imported and configured by the first Gemini request
+        self._genai = None
+        # Replaces the Gemini models when set (see set_backend)
+        self._backend = None
+        self._lock = threading.Lock()
+        # One limit for the whole process: blocking calls and the coroutines of every
+        # event loop (each pipeline thread runs its own asyncio.run) take their slot here
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        # Limits shared with the other processes of a batch (see set_rate_limit)
+        self._global_limit = None
+        # (model name, prefix hash) -> (model bound to the cached prefix, expiry time)
+        self._prefixes = OrderedDict()
+
+    def set_backend(self, backend):
+        """
+        Routes every request to `backend` (any object with generate_content and
+        generate_content_async, e.g. the offline StubModel). None restores Gemini.
+        """
+        self._backend = backend
+
+    def set_rate_limit(self, limit):
+        """
+        Makes every request also wait on `limit` (a GlobalRateLimit shared with
+        other processes). None removes it.
+        """
+        self._global_limit = limit
+
+    def get_model(self, model_name=DEFAULT_MODEL):
+        if self._backend is not None:
+            return self._backend
+        with self._lock:
+            if model_name not in self._models:
+                self._models[model_name] = self._load_sdk().GenerativeModel(model_name)
+            return self._models[model_name]
+
+    def _load_sdk(self):
+        # Importing google.generativeai takes most of the startup time: only pay it
+        # when a request really goes to Gemini (not for --help, the stub backend...)
+        if self._genai is None:
+            import google.generativeai as genai
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+            self._genai = genai
+        return self._genai
+
+    def _bind_prefix(self, model_name, prefix):
+        """
+        A model whose requests are appended to `prefix`, stored once by the backend,
+        or None when the backend cannot cache it.
+        """
+        if self._backend is not None:
+            bind = getattr(self._backend, "with_prefix", None)
+            return bind(prefix) if bind else None
+        genai = self._load_sdk()
+        caching = getattr(genai, "caching", None)  # context caching needs google-generativeai >= 0.7
+        if caching is None or len(prefix) // 4 < MIN_PROVIDER_PREFIX_TOKENS:
+            return None
+        try:
+            model_id = model_name if model_name.startswith("models/") else f"models/{model_name}"
+            # Kept a little longer on the server than in our table, so we never use an expired one
+            cached = caching.CachedContent.create(
+                model=model_id, contents=[prefix],
+                ttl=datetime.timedelta(seconds=PREFIX_CACHE_TTL_SECONDS + 60))
+            return genai.GenerativeModel.from_cached_content(cached_content=cached)
+        except Exception as e:
+            print(f"⚠️ Context caching unavailable ({e}), sending full prompts.")
+            return None
+
+    def _prefixed_model(self, model_name, prompt, prefix):
+        """
+        Returns (model, text to send). When the prompt starts with a prefix the
+        backend already holds, only the rest of the prompt is sent.
+        """
+        if not prefix or not prompt.startswith(prefix):
+            return self.get_model(model_name), prompt
+        key = (model_name, hashlib.sha256(prefix.encode("utf-8")).hexdigest())
+        now = time.monotonic()
+        with self._lock:
+            entry = self._prefixes.get(key)
+            if entry is not None and entry[1] > now:
+                self._prefixes.move_to_end(key)
+                record(prefix_cache_hits=1, cached_prompt_tokens=len(prefix) // 4)
+                return entry[0], prompt[len(prefix):]
+
+        bound = self._bind_prefix(model_name, prefix)
+        if bound is None:
+            return self.get_model(model_name), prompt
+        with self._lock:
+            self._prefixes[key] = (bound, now + PREFIX_CACHE_TTL_SECONDS)
+            while len(self._prefixes) > PREFIX_CACHE_MAX_ENTRIES:
+                self._prefixes.popitem(last=False)
+        # The prefix itself is uploaded once
+        record(prefix_cache_misses=1, prompt_tokens=len(prefix) // 4)
+        return bound, prompt[len(prefix):]
+
+    async def _acquire_slot(self):
+        # Blocking on the semaphore would stall the event loop, and waiting for it in
+        # executor threads could use up the threads the slot holders need: poll instead
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(SLOT_POLL_SECONDS)
+
+    def _generate_once(self, model, prompt, watcher=None):
+        start = time.perf_counter()
+        if watcher is None:
+            response = model.generate_content(prompt)
+            record_usage(prompt, response.text, time.perf_counter() - start,
+                         getattr(response, "usage_metadata", None))
+            return response.text
+
+        watcher.reset()
+        try:
+            for chunk in model.generate_content(prompt, stream=True):
+                if watcher.feed(chunk.text):
+                    # Leaving the loop closes the stream: the rest is never generated
+                    record(stream_early_stops=1)
+                    break
+        except MalformedOutput:
+            record(stream_aborts=1)
+            raise
+        finally:
+            record_usage(prompt, watcher.text, time.perf_counter() - start)
+        return watcher.text
+
+    async def _agenerate_once(self, model, prompt, watcher=None):
+        start = time.perf_counter()
+        if watcher is None:
+            response = await model.generate_content_async(prompt)
+            record_usage(prompt, response.text, time.perf_counter() - start,
+                         getattr(response, "usage_metadata", None))
+            return response.text
+
+        watcher.reset()
+        try:
+            async for chunk in await model.generate_content_async(prompt, stream=True):
+                if watcher.feed(chunk.text):
+                    record(stream_early_stops=1)
+                    break
+        except MalformedOutput:
+            record(stream_aborts=1)
+            raise
+        finally:
+            record_usage(prompt, watcher.text, time.perf_counter() - start)
+        return watcher.text
+
+    def generate(self, prompt, model_name=DEFAULT_MODEL, watcher=None, prefix=None):
+        """
+        Blocking call, returns the response text.
+        With a CodeBlockWatcher, the response is streamed and its code blocks are
+        checked as they arrive (MalformedOutput aborts the request).
+        `prefix` is the part of the prompt shared with other requests (instructions,
+        unchanged code): the backend caches it and later requests only send the rest.
+        """
+        model, prompt = self._prefixed_model(model_name, prompt, prefix)
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._slots:
+                    limit = self._global_limit
+                    if limit is None:
+                        return self._generate_once(model, prompt, watcher)
+                    time.sleep(limit.reserve())
+                    limit.acquire()
+                    try:
+                        return self._generate_once(model, prompt, watcher)
+                    finally:
+                        limit.release()
+            except Exception as e:
+                if attempt == self.max_retries or not is_rate_limited(e):
+                    raise
+                delay = get_retry_delay(e, attempt)
+                print(f"⏳ Rate limited, retrying in {delay:.1f}s...")
+                time.sleep(delay)
+
+    async def agenerate(self, prompt, model_name=DEFAULT_MODEL, watcher=None, prefix=None):
+        """
+        Same as generate() but does not block the event loop while waiting on the network.
+        """
+        if prefix:
+            # Uploading a new prefix is a blocking call
+            model, prompt = await asyncio.to_thread(self._prefixed_model, model_name, prompt, prefix)
+        else:
+            model = self.get_model(model_name)
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self._acquire_slot()
+                try:
+                    limit = self._global_limit
+                    if limit is None:
+                        return await self._agenerate_once(model, prompt, watcher)
+                    await asyncio.sleep(limit.reserve())
+                    # The shared semaphore blocks: wait for it off the event loop
+                    await asyncio.to_thread(limit.acquire)
+                    try:
+                        return await self._agenerate_once(model, prompt, watcher)
+                    finally:
+                        limit.release()
+                finally:
+                    self._slots.release()
+            except Exception as e:
+                if attempt == self.max_retries or not is_rate_limited(e):
+                    raise
+                delay = get_retry_delay(e, attempt)
+                print(f"⏳ Rate limited, retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Returns the process-wide ModelClient, creating it on first use.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ModelClient()
+        return _client
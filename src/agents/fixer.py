@@ -1,24 +1,32 @@
-import os
-import google.generativeai as genai
-from dotenv import load_dotenv
+from .base import BaseAgent
 
-load_dotenv()
 
-class Fixer:
-    def __init__(self):
-        api_key = os.getenv("GOOGLE_API_KEY")
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-3-flash-preview')
-        
-        prompt_path = os.path.join("src", "prompts", "fixer_prompt.txt")
-        with open(prompt_path, "r", encoding="utf-8") as f:
-            self.instructions = f.read()
+class Fixer(BaseAgent):
+    prompt_file = "fixer_prompt.txt"
+    # Le fichier corrigé est le premier bloc ```python : inutile d'attendre la suite
+    streams_code = True
+    single_code_block = True
 
-    def run(self, original_code, audit_report):
-        full_input = (
-            f"{self.instructions}\n\n"
-            f"CODE ORIGINAL:\n{original_code}\n\n"
-            f"RAPPORT AUDIT:\n{audit_report}"
-        )
-        response = self.model.generate_content(full_input)
-        return response.text
\ No newline at end of file
+    def prompt_prefix(self, original_code, *args):
+        # Instructions et code : identiques pour tous les candidats et après un rejet
+        return f"{self.instructions}\n\nCODE ORIGINAL:\n{original_code}\n\n"
+
+    def build_prompt(self, original_code, audit_report, candidate=0, rejection=None):
+        prompt = f"{self.prompt_prefix(original_code)}RAPPORT AUDIT:\n{audit_report}"
+        # Réponse précédente refusée par la validation locale : on explique pourquoi
+        if rejection:
+            prompt += f"\n\nTA RÉPONSE PRÉCÉDENTE A ÉTÉ REJETÉE : {rejection}\nCorrige ce problème."
+        # Meilleur-de-N : chaque candidat demande une proposition différente
+        # (et a donc sa propre entrée dans le cache de réponses)
+        if candidate:
+            prompt += f"\n\nPropose une correction différente des précédentes (variante n°{candidate + 1})."
+        return prompt
+
+
+
+class PatchFixer(Fixer):
+    # Ne renvoie que les fonctions/classes modifiées (ou un diff unifié) :
+    # les tokens de sortie suivent la taille de la correction, pas celle du fichier
+    prompt_file = "fixer_patch_prompt.txt"
+    # Plusieurs blocs possibles (un par fonction) : chacun est vérifié, aucun arrêt anticipé
+    single_code_block = False
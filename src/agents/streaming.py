@@ -0,0 +1,51 @@
+import ast
+import re
+
+# Same fence as graph.extract_code
+CODE_BLOCK = re.compile(r"```python\n(.*?)\n```", re.DOTALL)
+
+
+class MalformedOutput(ValueError):
+    """A streamed answer was abandoned because its code cannot be used."""
+
+
+class CodeBlockWatcher:
+    """
+    Follows a streamed answer chunk by chunk. Each ```python block is parsed as
+    soon as its closing fence arrives: a block that is not valid Python aborts
+    the request (MalformedOutput) instead of paying for the rest of the answer.
+
+    With stop_after_block, the answer is complete once its first valid block is
+    closed (the full-file Fixer: only that block is used).
+    """
+
+    def __init__(self, stop_after_block=False):
+        self.stop_after_block = stop_after_block
+        self.reset()
+
+    def reset(self):
+        # Called before each attempt: a retried request starts a new answer
+        self.text = ""
+        self.blocks = []
+        # Everything before this offset has already been checked
+        self._checked = 0
+
+    def feed(self, chunk):
+        """
+        Adds a chunk; returns True when the rest of the answer is not needed.
+        """
+        self.text += chunk
+        while True:
+            match = CODE_BLOCK.search(self.text, self._checked)
+            if match is None:
+                return False
+            self._checked = match.end()
+            try:
+                ast.parse(match.group(1))
+            except SyntaxError as e:
+                raise MalformedOutput(
+                    f"Code block {len(self.blocks) + 1} is not valid Python (line {e.lineno}: {e.msg})"
+                ) from e
+            self.blocks.append(match.group(1))
+            if self.stop_after_block:
+                return True
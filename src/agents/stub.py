@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+
+# Size of the chunks of a streamed stub answer
+STREAM_CHUNK_CHARS = 64
+
+
+def prompt_hash(prompt):
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class StubResponse:
+    """
+    Minimal stand-in for the SDK response: the client only reads `.text`.
+    """
+
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """
+    Deterministic offline model replaying recorded responses.
+
+    A recordings file holds exact responses keyed by the sha256 of the prompt
+    ("responses") and ordered rules ("rules"): the first rule whose "contains"
+    substrings all appear in the prompt gives the response. An unknown prompt
+    raises KeyError rather than inventing an answer.
+    """
+
+    def __init__(self, recordings, latency=0.0):
+        self.responses = recordings.get("responses", {})
+        self.rules = recordings.get("rules", [])
+        # Simulated network latency in seconds, to benchmark the orchestration under load
+        self.latency = latency
+
+    def _lookup(self, prompt):
+        if prompt_hash(prompt) in self.responses:
+            return self.responses[prompt_hash(prompt)]
+        for rule in self.rules:
+            if all(part in prompt for part in rule["contains"]):
+                return rule["response"]
+        raise KeyError(f"No recorded response for prompt {prompt_hash(prompt)[:12]}")
+
+    def _chunks(self, text):
+        return [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)] or [""]
+
+    def _stream(self, text):
+        # The latency is spread over the chunks, like a model generating its answer
+        chunks = self._chunks(text)
+        for chunk in chunks:
+            time.sleep(self.latency / len(chunks))
+            yield StubResponse(chunk)
+
+    async def _astream(self, text):
+        chunks = self._chunks(text)
+        for chunk in chunks:
+            await asyncio.sleep(self.latency / len(chunks))
+            yield StubResponse(chunk)
+
+    def generate_content(self, prompt, stream=False):
+        text = self._lookup(prompt)
+        if stream:
+            return self._stream(text)
+        time.sleep(self.latency)
+        return StubResponse(text)
+
+    async def generate_content_async(self, prompt, stream=False):
+        text = self._lookup(prompt)
+        if stream:
+            return self._astream(text)
+        await asyncio.sleep(self.latency)
+        return StubResponse(text)
+
+    def with_prefix(self, prefix):
+        """
+        Local equivalent of provider context caching: a view of the model that
+        keeps `prefix` and only receives what follows it.
+        """
+        return PrefixedStub(self, prefix)
+
+
+class PrefixedStub:
+    """
+    StubModel bound to a cached prompt prefix (see StubModel.with_prefix).
+    """
+
+    def __init__(self, model, prefix):
+        self.model = model
+        self.prefix = prefix
+
+    def generate_content(self, prompt, stream=False):
+        return self.model.generate_content(self.prefix + prompt, stream)
+
+    async def generate_content_async(self, prompt, stream=False):
+        return await self.model.generate_content_async(self.prefix + prompt, stream)
+
+
+class RecordingModel:
+    """
+    Wraps a real model and saves every prompt/response pair in the format StubModel replays.
+    """
+
+    def __init__(self, model, path):
+        self.model = model
+        self.path = path
+        self.recordings = {"responses": {}, "rules": []}
+        self._lock = threading.Lock()
+
+    def _save(self, prompt, response):
+        with self._lock:
+            self.recordings["responses"][prompt_hash(prompt)] = response.text
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.recordings, f, indent=4, ensure_ascii=False)
+
+    # A streamed request is recorded from the complete answer, replayed as one chunk
+
+    def generate_content(self, prompt, stream=False):
+        response = self.model.generate_content(prompt)
+        self._save(prompt, response)
+        return iter([response]) if stream else response
+
+    async def generate_content_async(self, prompt, stream=False):
+        response = await self.model.generate_content_async(prompt)
+        self._save(prompt, response)
+        if not stream:
+            return response
+
+        async def replay():
+            yield response
+        return replay()
+
+
+def load_recordings(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,181 @@
+import json
+import multiprocessing
+import os
+import re
+import time
+import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.agents.client import GlobalRateLimit, get_client, MAX_CONCURRENT_REQUESTS
+from src.budget import RunBudget
+from src.checkpoints import new_run_id, save_run
+from src.telemetry import save_experiment_data, reset_span_totals
+from src.utils.logger import get_sink, merge_shards
+
+BATCH_DIR = os.path.join("logs", "batch")
+
+# Targets refactored at the same time (one process each)
+DEFAULT_JOBS = 2
+
+
+def load_manifest(path):
+    """
+    Reads the list of targets of a batch run.
+    Either a JSON list (paths or {"target_dir": ..., "candidates": ..., "fixer_output": ...})
+    or a text file with one target directory per line ('#' starts a comment).
+    Relative paths are relative to the manifest.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    if text.lstrip().startswith("["):
+        entries = json.loads(text)
+    else:
+        entries = [line.split("#", 1)[0].strip() for line in text.splitlines()]
+        entries = [line for line in entries if line]
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    targets = []
+    for entry in entries:
+        target = dict(entry) if isinstance(entry, dict) else {"target_dir": entry}
+        if "target_dir" not in target:
+            raise ValueError(f"Manifest entry without target_dir: {entry}")
+        target["target_dir"] = os.path.normpath(os.path.join(base_dir, target["target_dir"]))
+        targets.append(target)
+    return targets
+
+
+def result_file_name(target_dir):
+    """
+    Name of a target's result file, readable and unique per path.
+    """
+    name = re.sub(r"[^A-Za-z0-9_.-]+", "_", os.path.relpath(target_dir)).strip("_.")
+    return f"{name or 'target'}.json"
+
+
+# Budget of the whole batch, shared with the parent (set in each worker process)
+_batch_budget = None
+
+
+def _init_worker(rate_limit, no_cache, budget=None):
+    # Every worker process shares the parent's LLM limits and budget
+    global _batch_budget
+    if no_cache:
+        os.environ["SWARM_NO_CACHE"] = "1"
+    get_client().set_rate_limit(rate_limit)
+    _batch_budget = budget
+
+
+def run_target(target, output_path, max_workers, num_candidates, fixer_output, convergence=None,
+               file_budget=None):
+    """
+    Runs the swarm on one target of the batch (inside a worker process) and writes
+    its experiment data to output_path. Returns the target's summary line.
+    """
+    # Imported here: the graph is only needed in the worker processes
+    from src.graph import run_swarm
+
+    target_dir = target["target_dir"]
+    num_candidates = target.get("candidates", num_candidates)
+    fixer_output = target.get("fixer_output", fixer_output)
+    run_id = new_run_id()
+    save_run(run_id, target_dir, {"candidates": num_candidates, "fixer_output": fixer_output,
+                                  "convergence": convergence, "file_budget": file_budget})
+    reset_span_totals()
+
+    initial_state = {"messages": [], "target_dir": target_dir, "loop_count": 0}
+    start_time = time.time()
+    try:
+        final_state = run_swarm(target_dir, max_workers=max_workers, num_candidates=num_candidates,
+                                fixer_output=fixer_output, run_id=run_id, convergence=convergence,
+                                file_budget=file_budget, run_budget=_batch_budget)
+    except Exception as e:
+        print(f"💥 {target_dir} crashed: {e}")
+        final_state = {**initial_state, "error": str(e)}
+    end_time = time.time()
+
+    data = save_experiment_data(initial_state, final_state, start_time, end_time, output_path)
+    get_sink().flush()
+    return {
+        "target_dir": target_dir,
+        "run_id": run_id,
+        "status": data["result"]["status"],
+        "duration_seconds": end_time - start_time,
+        "iterations": data["metadata"]["total_iterations"],
+        "final_pylint_score": data["metadata"]["final_pylint_score"],
+        "files": len(data["files"]),
+        "result_file": output_path,
+        "error": data["result"]["error"],
+        # The worker's telemetry is in its own shard until run_batch merges it
+        "pid": os.getpid(),
+    }
+
+
+def run_batch(targets, jobs=DEFAULT_JOBS, max_workers=None, num_candidates=1, fixer_output="patch",
+              convergence=None, max_concurrent_requests=MAX_CONCURRENT_REQUESTS, requests_per_minute=None,
+              no_cache=False, output_dir=None, file_budget=None, batch_budget=None):
+    """
+    Runs the swarm over many targets on a pool of `jobs` processes.
+    LLM limits (in-flight requests, requests per minute) are global to the batch,
+    not per process, and so is `batch_budget` ({"tokens", "seconds", "subprocess_seconds"});
+    `file_budget` applies to every file of every target. Each target gets its own
+    result file (and run id, so it can be continued with --resume); the batch
+    summary, with what the batch consumed, goes to summary.json.
+    """
+    from src.graph import DEFAULT_MAX_WORKERS
+
+    batch_id = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    output_dir = output_dir or os.path.join(BATCH_DIR, batch_id)
+    os.makedirs(output_dir, exist_ok=True)
+    max_workers = max_workers or DEFAULT_MAX_WORKERS
+
+    # spawn: the workers start from a clean interpreter (no inherited threads or sqlite connections)
+    context = multiprocessing.get_context("spawn")
+    rate_limit = GlobalRateLimit(max_concurrent_requests, requests_per_minute, context)
+    budget = RunBudget(batch_budget, context)
+    summary = {
+        "batch_id": batch_id,
+        "start_time": datetime.datetime.now().isoformat(),
+        "targets": []
+    }
+    start = time.time()
+
+    with ProcessPoolExecutor(max_workers=max(1, jobs), mp_context=context,
+                             initializer=_init_worker, initargs=(rate_limit, no_cache, budget)) as pool:
+        futures = {}
+        for target in targets:
+            output_path = os.path.join(output_dir, result_file_name(target["target_dir"]))
+            future = pool.submit(run_target, target, output_path, max_workers, num_candidates, fixer_output,
+                                 convergence, file_budget)
+            futures[future] = target
+        for future in as_completed(futures):
+            target = futures[future]
+            try:
+                line = future.result()
+            except Exception as e:
+                # The worker process itself died (the swarm's own errors are caught in run_target)
+                line = {"target_dir": target["target_dir"], "status": "CRASHED", "error": str(e)}
+            print(f"📦 {line['target_dir']}: {line['status']}")
+            summary["targets"].append(line)
+
+    order = {target["target_dir"]: i for i, target in enumerate(targets)}
+    summary["targets"].sort(key=lambda line: order[line["target_dir"]])
+    statuses = [line["status"] for line in summary["targets"]]
+    summary["end_time"] = datetime.datetime.now().isoformat()
+    summary["duration_seconds"] = time.time() - start
+    summary["counts"] = {
+        "total": len(statuses),
+        "success": statuses.count("SUCCESS"),
+        "crashed": statuses.count("CRASHED"),
+        "failed": len(statuses) - statuses.count("SUCCESS") - statuses.count("CRASHED"),
+    }
+    summary["budget"] = budget.summary()
+
+    summary_path = os.path.join(output_dir, "summary.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=4)
+    get_sink().emit({"event": "batch_summary", "timestamp": summary["end_time"], **summary})
+    # Only the shards of this batch: another run may be writing its own meanwhile
+    merge_shards(pids=[os.getpid()] + [line["pid"] for line in summary["targets"] if "pid" in line])
+    print(f"✅ Batch summary saved to {summary_path}")
+    return summary
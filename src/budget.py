@@ -0,0 +1,86 @@
+import multiprocessing
+import time
+
+# What a budget can limit: LLM tokens, wall-clock seconds and seconds spent in
+# test subprocesses (pytest workers)
+BUDGET_KEYS = ("tokens", "seconds", "subprocess_seconds")
+
+# Below this share of any budget left, the swarm switches to cheaper settings
+LOW_BUDGET_FRACTION = 0.3
+
+# Model used by the Fixer once the budget runs low
+CHEAP_MODEL = "gemini-2.5-flash-lite"
+
+
+def new_file_budget(limits=None):
+    """
+    Initial GraphState["budget"] of one file: its limits (None or 0 = unlimited)
+    and what it has used so far.
+    """
+    return {
+        "limits": {key: value for key, value in (limits or {}).items() if value},
+        "used": dict.fromkeys(BUDGET_KEYS, 0),
+    }
+
+
+def remaining_fraction(limits, used):
+    """
+    Share left of the tightest limit (1.0 when nothing is limited).
+    """
+    return min((1 - used.get(key, 0) / limit for key, limit in limits.items()), default=1.0)
+
+
+def budget_level(fraction):
+    if fraction <= 0:
+        return "exhausted"
+    if fraction < LOW_BUDGET_FRACTION:
+        return "low"
+    return "ok"
+
+
+class RunBudget:
+    """
+    Limits shared by every file of a run. Built on multiprocessing values, so one
+    instance created in the parent and handed to the workers of a batch (like
+    GlobalRateLimit) is a budget for the whole batch.
+    Seconds are wall-clock time since the budget was created.
+    """
+
+    def __init__(self, limits=None, context=None):
+        context = context or multiprocessing.get_context("spawn")
+        self.limits = {key: value for key, value in (limits or {}).items() if value}
+        self._lock = context.Lock()
+        self._used = {key: context.Value("d", 0.0, lock=False) for key in ("tokens", "subprocess_seconds")}
+        self._started = time.time()
+
+    def charge(self, tokens=0, subprocess_seconds=0.0):
+        with self._lock:
+            self._used["tokens"].value += tokens
+            self._used["subprocess_seconds"].value += subprocess_seconds
+
+    def used(self):
+        with self._lock:
+            used = {key: value.value for key, value in self._used.items()}
+        used["seconds"] = time.time() - self._started
+        return used
+
+    def remaining_fraction(self):
+        return remaining_fraction(self.limits, self.used())
+
+    def summary(self):
+        return {"limits": self.limits, "used": self.used()}
+
+
+_run_budget = None
+
+
+def set_run_budget(budget):
+    """
+    Makes `budget` the run budget seen by the graph nodes of this process (None: unlimited).
+    """
+    global _run_budget
+    _run_budget = budget
+
+
+def get_run_budget():
+    return _run_budget
@@ -0,0 +1,72 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+CHECKPOINT_DB = os.path.join(".swarm_cache", "checkpoints.sqlite")
+
+
+def _connect(path=CHECKPOINT_DB):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Pipelines run on worker threads: each gets its own connection, waiting on locks
+    return sqlite3.connect(path, timeout=30, check_same_thread=False)
+
+
+def new_run_id():
+    return uuid.uuid4().hex[:12]
+
+
+def save_run(run_id, target_dir, options, path=CHECKPOINT_DB):
+    """
+    Remembers the arguments of a run so that --resume only needs its id.
+    """
+    with _connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, target_dir TEXT,"
+            " options TEXT, created_at REAL)"
+        )
+        conn.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?)",
+                     (run_id, target_dir, json.dumps(options), time.time()))
+
+
+def load_run(run_id, path=CHECKPOINT_DB):
+    """
+    Returns {"target_dir", "options"} of a previous run, or None if unknown.
+    """
+    with _connect(path) as conn:
+        try:
+            row = conn.execute("SELECT target_dir, options FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        except sqlite3.OperationalError:
+            return None
+    if row is None:
+        return None
+    return {"target_dir": row[0], "options": json.loads(row[1])}
+
+
+def get_checkpointer(path=CHECKPOINT_DB):
+    """
+    A checkpoint saver writing the graph state after every step (i.e. every node).
+    """
+    from langgraph.checkpoint.base import CheckpointAt
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    return SqliteSaver(conn=_connect(path), at=CheckpointAt.END_OF_STEP)
+
+
+def thread_config(run_id, file_path, target_dir):
+    """
+    LangGraph config of one file's pipeline: each file is its own checkpoint thread.
+    """
+    thread_id = f"{run_id}:{os.path.relpath(file_path, target_dir)}"
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def load_saved_state(checkpointer, config):
+    """
+    Graph state of the last completed node of a thread, or None if it never ran.
+    """
+    checkpoint = checkpointer.get(config)
+    if checkpoint is None:
+        return None
+    return checkpoint["channel_values"]
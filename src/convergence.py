@@ -0,0 +1,136 @@
+DEFAULT_POLICY = "adaptive"
+
+
+class ConvergencePolicy:
+    """
+    Decides, after each Judge step, whether another Fixer iteration is worth it.
+    decide(state) returns ("fixer" or "end", reason).
+
+    Policies read GraphState["trajectory"]: one entry per Fixer -> Judge iteration
+    ({"loop", "score", "previous_score", "passed", "failed", "seconds", "tokens"}).
+    Their options come from GraphState["convergence"] (see get_policy).
+    """
+
+    def __init__(self, max_iterations=10, target_score=9.5):
+        self.max_iterations = max_iterations
+        self.target_score = target_score
+
+    def decide(self, state):
+        raise NotImplementedError
+
+
+class FixedThresholdPolicy(ConvergencePolicy):
+    """
+    The original rules: loop while tests fail, stop at max_iterations, at the
+    target score, or when the score equals the previous one.
+    """
+
+    def decide(self, state):
+        current_score = state["current_pylint_score"]
+        prev_score = state.get("previous_pylint_score")
+        if "FAIL" in state["messages"][-1].content:
+            return "fixer", "Tests failing."
+        if state["loop_count"] >= self.max_iterations:
+            return "end", "Max iterations reached."
+        if current_score >= self.target_score:
+            return "end", f"Target reached ({current_score}/10)."
+        if prev_score is not None and current_score == prev_score:
+            return "end", f"Score is stuck at {current_score}/10."
+        return "fixer", f"Score {current_score}/10 needs improvement."
+
+
+def is_oscillating(trajectory, window=4):
+    """
+    True when the last `window` iterations only alternate between two outcomes
+    (score and number of failing tests), or repeat the same one: more iterations
+    would go round in circles.
+    """
+    if len(trajectory) < 3:
+        return False
+    outcomes = [(entry["score"], entry["failed"]) for entry in trajectory[-window:]]
+    if len(set(outcomes[-3:])) == 1:
+        return True
+    return (len(outcomes) == window and len(set(outcomes)) == 2
+            and all(a != b for a, b in zip(outcomes, outcomes[1:])))
+
+
+class AdaptivePolicy(ConvergencePolicy):
+    """
+    Keeps iterating while the expected score gain of one more iteration is worth
+    its measured cost.
+
+    The expected gain is the average score change over the last `window`
+    iterations (capped by the points left to reach 10). An iteration is worth it
+    when that gain is at least min_gain_per_minute per minute of its average
+    duration and min_gain_per_1k_tokens per thousand LLM tokens. Failing tests
+    always get another iteration, unless the trajectory oscillates.
+    """
+
+    def __init__(self, max_iterations=10, target_score=9.5, min_gain_per_minute=0.2,
+                 min_gain_per_1k_tokens=0.05, window=3):
+        super().__init__(max_iterations, target_score)
+        self.min_gain_per_minute = min_gain_per_minute
+        self.min_gain_per_1k_tokens = min_gain_per_1k_tokens
+        self.window = window
+
+    def expected_gain(self, trajectory):
+        recent = trajectory[-self.window:]
+        gains = [entry["score"] - entry["previous_score"] for entry in recent
+                 if entry.get("previous_score") is not None]
+        if not gains:
+            return None
+        return min(sum(gains) / len(gains), 10.0 - trajectory[-1]["score"])
+
+    def decide(self, state):
+        trajectory = state.get("trajectory") or []
+        current_score = state["current_pylint_score"]
+        tests_fail = "FAIL" in state["messages"][-1].content
+
+        if state["loop_count"] >= self.max_iterations:
+            return "end", "Max iterations reached."
+        if is_oscillating(trajectory):
+            scores = ", ".join(str(entry["score"]) for entry in trajectory[-4:])
+            return "end", f"Going round in circles (last scores: {scores})."
+        if tests_fail:
+            return "fixer", "Tests failing."
+        if current_score >= self.target_score:
+            return "end", f"Target reached ({current_score}/10)."
+
+        gain = self.expected_gain(trajectory)
+        if gain is None:
+            # Nothing measured yet (e.g. the Auditor found nothing to fix)
+            return "fixer", f"Score {current_score}/10 needs improvement."
+        recent = trajectory[-self.window:]
+        minutes = sum(entry["seconds"] for entry in recent) / len(recent) / 60
+        kilo_tokens = sum(entry["tokens"] for entry in recent) / len(recent) / 1000
+        if gain <= 0:
+            return "end", f"No improvement expected (score {current_score}/10)."
+        if minutes and gain / minutes < self.min_gain_per_minute:
+            return "end", f"Expected gain {gain:.2f} not worth {minutes * 60:.0f}s per iteration."
+        if kilo_tokens and gain / kilo_tokens < self.min_gain_per_1k_tokens:
+            return "end", f"Expected gain {gain:.2f} not worth {kilo_tokens * 1000:.0f} tokens per iteration."
+        return "fixer", f"Score {current_score}/10, expecting +{gain:.2f} next iteration."
+
+
+POLICIES = {
+    "adaptive": AdaptivePolicy,
+    "fixed": FixedThresholdPolicy,
+}
+
+
+def register_policy(name, policy_class):
+    """
+    Makes a custom ConvergencePolicy selectable with {"policy": name}.
+    """
+    POLICIES[name] = policy_class
+
+
+def get_policy(options=None):
+    """
+    Builds the policy described by GraphState["convergence"]: {"policy": name, **options}.
+    """
+    options = dict(options or {})
+    name = options.pop("policy", DEFAULT_POLICY)
+    if name not in POLICIES:
+        raise ValueError(f"Unknown convergence policy: {name} (choose from {', '.join(POLICIES)})")
+    return POLICIES[name](**options)
@@ -1,48 +1,140 @@
 import os
+import asyncio
+import datetime
+import functools
 import glob
 import re
-from typing import TypedDict, List, Annotated, Optional
-import operator
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TypedDict, Annotated, Optional
 
 # 1. Imports
-from src.agents import Auditor, Fixer, Judge
-from src.tools.code_tools import write_file_safely, run_pytest, run_pylint
+# langgraph, langchain and the Gemini SDK are only imported when first needed,
+# so `main.py --help`, batch workers and tests start quickly
+from src.agents import Auditor, Fixer, PatchFixer
+from src.agents.client import DEFAULT_MODEL
+from src.agents.streaming import MalformedOutput
+from src.tools.code_tools import write_file_safely
+from src.tools.lint_engine import lint_file, lint_directory
+from src.tools.pytest_runner import run_affected_tests, format_failures
+from src.tools.candidates import evaluate_candidates, pick_best
+from src.tools.patching import PatchError, apply_fixer_output
+from src.tools.chunking import split_into_chunks
+from src.tools.validation import ValidationError, validate_candidate
+from src.telemetry import span, record, traced, current_metrics
+from src.convergence import get_policy
+from src.budget import CHEAP_MODEL, budget_level, get_run_budget, new_file_budget, remaining_fraction, set_run_budget
+from src.utils.logger import get_sink
+from src.checkpoints import get_checkpointer, thread_config, load_saved_state
 
 # 2. Define State
+
+# Messages kept in memory per pipeline; the full history goes to the telemetry stream
+MAX_MESSAGES = 8
+# Longer messages (e.g. pytest logs) keep only their head and tail in the state
+MAX_MESSAGE_CHARS = 4000
+
+def keep_recent_messages(existing, new):
+    """
+    Reducer of GraphState.messages: appends like operator.add, but only the last
+    MAX_MESSAGES messages are kept so memory stays flat over long runs.
+    """
+    return (existing + new)[-MAX_MESSAGES:]
+
 class GraphState(TypedDict):
-    messages: Annotated[List[BaseMessage], operator.add]
+    # langchain BaseMessage objects (typed as a plain list to keep langchain out of the import)
+    messages: Annotated[list, keep_recent_messages]
     target_dir: str
+    # The source file this pipeline is refactoring (one pipeline per file)
+    file_path: str
+    # Fixes generated per Fixer iteration (best-of-N when > 1)
+    num_candidates: int
+    # "patch": the Fixer returns changed functions or a diff; "full": the whole file
+    fixer_output: str
+    # Audit of each chunk of a large file, keyed by the chunk source hash
+    chunk_audits: dict
+    # Content of the file after the last node, restored when a run is resumed
+    file_snapshot: str
     loop_count: int
     current_pylint_score: float
     # We track the previous score to detect if we are "Stuck"
     previous_pylint_score: Optional[float]
+    # One entry per Fixer -> Judge iteration (score, tests, cost), read by the convergence policy
+    trajectory: list
+    # {"policy": name, **options} of the convergence policy (see src/convergence.py)
+    convergence: dict
+    # Start time and LLM tokens of the current iteration's Fixer step
+    iteration_started: float
+    iteration_tokens: int
+    # {"limits": ..., "used": ...} tokens, seconds and test subprocess seconds of this file (see src/budget.py)
+    budget: dict
+
+# 3. Agents (created on first use and shared by every pipeline of the process)
+_agents = {}
+_agents_lock = threading.Lock()
+
+def get_agent(agent_class, model_name=DEFAULT_MODEL):
+    with _agents_lock:
+        if (agent_class, model_name) not in _agents:
+            _agents[agent_class, model_name] = agent_class(model_name)
+        return _agents[agent_class, model_name]
 
-# 3. Instantiate Agents
-auditor = Auditor()
-fixer = Fixer()
-judge = Judge()
+# Number of per-file pipelines allowed to run at the same time
+DEFAULT_MAX_WORKERS = 4
+
+# Fixer answers failing the local validation are sent back this many times in total
+MAX_FIX_ATTEMPTS = 3
+
+# Files linting at least this score and passing their tests skip the LLM entirely
+TRIAGE_MIN_SCORE = 9.5
 
 # --- Helpers ---
+def get_source_files(target_dir):
+    """
+    Returns every non-test Python file of the target directory, sorted.
+    """
+    files = sorted(glob.glob(os.path.join(target_dir, "*.py")))
+    return [f for f in files if not os.path.basename(f).startswith("test_")]
+
 def get_main_file_path(target_dir):
-    files = glob.glob(os.path.join(target_dir, "*.py"))
-    code_files = [f for f in files if "test_" not in f]
+    code_files = get_source_files(target_dir)
     if code_files:
         return code_files[0]
+    files = glob.glob(os.path.join(target_dir, "*.py"))
     return files[0] if files else None
 
-def read_code(target_dir):
-    file_path = get_main_file_path(target_dir)
+def get_file_path(state):
+    # Older callers only pass target_dir: fall back to the first source file
+    return state.get("file_path") or get_main_file_path(state["target_dir"])
+
+def read_code(target_dir, file_path=None):
+    file_path = file_path or get_main_file_path(target_dir)
     if file_path:
         with open(file_path, 'r', encoding='utf-8') as f:
             return f.read()
     return ""
 
-def extract_pylint_score(pylint_output):
-    match = re.search(r'rated at (\d+\.\d+)', pylint_output)
-    if match:
-        return float(match.group(1))
-    return 0.0
+def truncate_text(text, limit=MAX_MESSAGE_CHARS):
+    if len(text) <= limit:
+        return text
+    head = limit // 2
+    tail = limit - head
+    return f"{text[:head]}\n... [{len(text) - limit} characters truncated] ...\n{text[-tail:]}"
+
+def agent_message(agent, content, file_path=None, truncate=True):
+    """
+    Builds a node's message. The full content is spilled to the telemetry stream;
+    the state only keeps a truncated copy (unless truncate=False, for the audit
+    plan the Fixer works from). The agent name and creation time are kept for telemetry.
+    """
+    from langchain_core.messages import AIMessage
+
+    timestamp = datetime.datetime.now().isoformat()
+    get_sink().emit({"event": "message", "agent": agent, "file": file_path,
+                     "timestamp": timestamp, "content": content})
+    return AIMessage(content=truncate_text(content) if truncate else content, name=agent,
+                     additional_kwargs={"timestamp": timestamp})
 
 def extract_code(llm_output):
     match = re.search(r'```python\n(.*?)\n```', llm_output, re.DOTALL)
@@ -50,134 +142,504 @@ def extract_code(llm_output):
         return match.group(1)
     return llm_output
 
+def is_clean_audit(audit):
+    audit = audit.lower()
+    return any(keyword in audit for keyword in ["no changes needed", "code is perfect", "no bugs"])
+
+def audit_code(code, previous_audits, model_name=DEFAULT_MODEL):
+    """
+    Audits a file. Large files are split into function/class chunks audited
+    concurrently; chunks whose source is unchanged reuse their previous audit.
+    Returns (plan, audits by chunk hash).
+    """
+    chunks = split_into_chunks(code)
+    auditor = get_agent(Auditor, model_name)
+    if len(chunks) == 1:
+        return auditor.run(code), {}
+
+    pending = [c for c in chunks if c["hash"] not in previous_audits]
+
+    async def audit_all():
+        return await asyncio.gather(*(auditor.arun(c["source"]) for c in pending))
+
+    audits = {c["hash"]: previous_audits[c["hash"]] for c in chunks if c["hash"] in previous_audits}
+    if pending:
+        audits.update(zip((c["hash"] for c in pending), asyncio.run(audit_all())))
+    print(f"🧩 Audited {len(pending)}/{len(chunks)} chunks (others unchanged)")
+
+    # Only chunks with findings go into the plan, so one clean chunk does not hide the others
+    findings = [
+        f"### {c['kind']} {c['name']}".rstrip() + f"\n{audits[c['hash']]}"
+        for c in chunks if not is_clean_audit(audits[c["hash"]])
+    ]
+    plan = "\n\n".join(findings) if findings else "No bugs found in any chunk."
+    return plan, audits
+
+def get_budget_level(state):
+    """
+    "ok", "low" or "exhausted": the tighter of this file's budget and the run's.
+    """
+    budget = state.get("budget") or {}
+    fraction = remaining_fraction(budget.get("limits", {}), budget.get("used", {}))
+    run_budget = get_run_budget()
+    if run_budget is not None:
+        fraction = min(fraction, run_budget.remaining_fraction())
+    return budget_level(fraction)
+
+def budget_model(state):
+    # Low budget: the remaining LLM calls go to the cheaper model
+    return CHEAP_MODEL if get_budget_level(state) != "ok" else DEFAULT_MODEL
+
+def apply_fix(original_code, llm_output, output_mode):
+    """
+    Turns a Fixer answer into the new file content (raises PatchError in patch mode).
+    """
+    if output_mode == "patch":
+        return apply_fixer_output(original_code, llm_output)
+    return extract_code(llm_output)
+
 # 4. Nodes
 
+def triage_node(state: GraphState):
+    """
+    Cheap local check before any model call: lint, then (only if lint is already
+    good) the affected tests, both answered from their caches when the code is unchanged.
+    """
+    file_path = get_file_path(state)
+    with span("pylint", file=file_path):
+        score = lint_file(file_path)["score"]
+
+    result = f"Needs work: pylint {score}/10."
+    if score >= TRIAGE_MIN_SCORE:
+        with span("pytest", file=file_path):
+            report = run_affected_tests(state["target_dir"], file_path, use_cache=True)
+            record(subprocess_seconds=report["subprocess_seconds"])
+        if report["passed"]:
+            result = f"SUCCESS (triage): pylint {score}/10, {report['total']} tests passing. No changes needed."
+            print(f"⏭️ {os.path.basename(file_path)} is already clean ({score}/10, tests pass). Skipping.")
+        else:
+            result = f"Needs work: {report['failed']} of {report['total']} tests failing."
+
+    return {
+        "messages": [agent_message("Triage", result, file_path)],
+        "loop_count": state["loop_count"],
+        "current_pylint_score": score,
+        "previous_pylint_score": state.get("previous_pylint_score")
+    }
+
 def auditor_node(state: GraphState):
-    print(f"\n{'='*20} ITERATION {state['loop_count']} {'='*20}")
+    file_path = get_file_path(state)
+    print(f"\n{'='*20} {os.path.basename(file_path)} - ITERATION {state['loop_count']} {'='*20}")
     print("🧠 Auditor is analyzing the code...")
     
-    # Run Pylint
-    pylint_output = run_pylint(state["target_dir"])
-    current_score = extract_pylint_score(pylint_output)
+    # Run Pylint (in-process, on this file only)
+    with span("pylint", file=file_path):
+        current_score = lint_file(file_path)["score"]
     print(f"📊 Current Code Quality: {current_score}/10")
     
     # Ask Auditor
-    original_code = read_code(state["target_dir"])
-    plan = auditor.run(original_code)
+    original_code = read_code(state["target_dir"], file_path)
+    plan, chunk_audits = audit_code(original_code, state.get("chunk_audits") or {}, budget_model(state))
     
     return {
-        "messages": [AIMessage(content=plan)],
+        "messages": [agent_message("Auditor", plan, file_path, truncate=False)],
+        "chunk_audits": chunk_audits,
         "loop_count": state["loop_count"],
         "current_pylint_score": current_score,
         "previous_pylint_score": state.get("previous_pylint_score") # Keep previous if exists
     }
 
+def fixer_failure(state, message, file_path):
+    """
+    Fixer update when no new code was written: the iteration counts, the score stays.
+    """
+    return {
+        "messages": [agent_message("Fixer", message, file_path)],
+        "loop_count": state["loop_count"] + 1,
+        "current_pylint_score": state["current_pylint_score"],
+        "previous_pylint_score": state["current_pylint_score"]
+    }
+
 def fixer_node(state: GraphState):
-    print(f"🛠️ Fixer Node (Loop #{state['loop_count']})...")
+    file_path = get_file_path(state)
+    print(f"🛠️ Fixer Node ({os.path.basename(file_path)}, Loop #{state['loop_count']})...")
     
-    original_code = read_code(state["target_dir"])
+    original_code = read_code(state["target_dir"], file_path)
     plan = state["messages"][-1].content
     
-    # 1. Generate Fix
-    fixed_code_text = fixer.run(original_code, plan)
-    clean_code = extract_code(fixed_code_text)
+    filename = os.path.relpath(file_path, state["target_dir"])
+
+    # 1. Generate Fix (answers that fail the local checks go straight back to the Fixer)
+    rejection = None
+    for attempt in range(MAX_FIX_ATTEMPTS):
+        try:
+            clean_code = generate_fix(state, filename, original_code, plan, rejection)
+            validate_candidate(original_code, clean_code, filename)
+            break
+        except (MalformedOutput, PatchError, ValidationError) as e:
+            # Rejected before anything is written, linted or tested
+            record(validation_rejections=1)
+            rejection = str(e)
+            print(f"❌ Fixer output rejected ({attempt + 1}/{MAX_FIX_ATTEMPTS}): {e}")
+    else:
+        return fixer_failure(state, f"Fixer output rejected: {rejection}", file_path)
     
-    # 2. Write File
-    filename = os.path.basename(get_main_file_path(state["target_dir"]))
+    # 2. Write File (atomically: the Judge and the next iteration work on the real file,
+    # and every checkpoint keeps the previous version for --resume)
     try:
         write_file_safely(state["target_dir"], filename, clean_code)
         print(f"✅ Updated file: {filename}")
     except Exception as e:
         print(f"❌ Error writing file: {e}")
-        return {
-            "messages": [AIMessage(content=f"Error: {e}")],
-            "loop_count": state["loop_count"] + 1,
-            "current_pylint_score": state["current_pylint_score"],
-            "previous_pylint_score": state["current_pylint_score"]
-        }
+        return fixer_failure(state, f"Error writing file: {e}", file_path)
 
     # 3. Measure NEW Score
-    pylint_output = run_pylint(state["target_dir"])
-    new_score = extract_pylint_score(pylint_output)
+    with span("pylint", file=file_path):
+        new_score = lint_file(file_path)["score"]
     print(f"📈 New Score: {new_score}/10 (Previous: {state['current_pylint_score']}/10)")
     
     return {
-        "messages": [AIMessage(content=f"Code updated. New score: {new_score}")],
+        "messages": [agent_message("Fixer", f"Code updated. New score: {new_score}", file_path)],
         "loop_count": state["loop_count"] + 1,
         "current_pylint_score": new_score,
         # The OLD current_score becomes the NEW previous_score
         "previous_pylint_score": state["current_pylint_score"] 
     }
 
+def generate_fix(state, filename, original_code, plan, rejection=None):
+    """
+    One Fixer answer turned into the new file content (best of N when num_candidates > 1).
+    `rejection` tells the Fixer why its previous answer was refused.
+    """
+    num_candidates = state.get("num_candidates", 1)
+    output_mode = state.get("fixer_output", "patch")
+    model_name = budget_model(state)
+    if model_name != DEFAULT_MODEL:
+        # Low budget: one candidate from the cheaper model
+        print(f"💸 Budget running low: single candidate from {model_name}")
+        num_candidates = 1
+    if num_candidates > 1:
+        return generate_best_fix(state["target_dir"], filename, original_code, plan,
+                                 num_candidates, output_mode, rejection)
+
+    agent = get_agent(PatchFixer if output_mode == "patch" else Fixer, model_name)
+    try:
+        return apply_fix(original_code, agent.run(original_code, plan, 0, rejection), output_mode)
+    except (PatchError, MalformedOutput) as e:
+        if output_mode != "patch":
+            raise
+        print(f"⚠️ Patch rejected ({e}). Asking for the full file...")
+        return extract_code(get_agent(Fixer, model_name).run(original_code, plan, 0, rejection))
+
+def generate_best_fix(target_dir, filename, original_code, plan, num_candidates, output_mode="patch",
+                      rejection=None):
+    """
+    Asks the Fixer for several candidates at once, drops those failing the local
+    validation, lints and tests the others each in its own scratch workspace in
+    parallel, and returns the best one.
+    """
+    agent = get_agent(PatchFixer if output_mode == "patch" else Fixer)
+
+    async def generate_all():
+        return await asyncio.gather(
+            *(agent.arun(original_code, plan, i, rejection) for i in range(num_candidates)),
+            return_exceptions=True
+        )
+
+    outputs = asyncio.run(generate_all())
+    errors = [o for o in outputs if isinstance(o, Exception)]
+    candidates = []
+    for output in outputs:
+        if isinstance(output, Exception):
+            continue
+        try:
+            code = apply_fix(original_code, output, output_mode)
+            validate_candidate(original_code, code, filename)
+        except (PatchError, ValidationError) as e:
+            errors.append(e)
+            continue
+        if code not in candidates:
+            candidates.append(code)
+    if not candidates:
+        if output_mode == "patch" and all(isinstance(e, (PatchError, MalformedOutput)) for e in errors):
+            # Same fallback as the single-candidate path
+            print(f"⚠️ No patch could be applied ({errors[0]}). Asking for the full file...")
+            return extract_code(get_agent(Fixer).run(original_code, plan, 0, rejection))
+        # Nothing usable: surface the first error like the single-candidate path would
+        raise errors[0]
+
+    with span("candidates", file=filename, count=len(candidates)):
+        results = evaluate_candidates(target_dir, filename, candidates)
+        record(subprocess_seconds=sum(r["report"]["subprocess_seconds"] for r in results))
+    best = pick_best(results)
+    passing = sum(1 for r in results if r["passed"])
+    print(f"🏆 Best of {len(candidates)} candidates: {best['score']}/10 ({passing} passing tests)")
+    return best["code"]
+
 def judge_node(state: GraphState):
+    file_path = get_file_path(state)
     print("⚖️ Judge is running Unit Tests...")
-    test_output = run_pytest(state["target_dir"])
+    # Only the tests importing this file (directly or not), sharded over several processes
+    with span("pytest", file=file_path):
+        report = run_affected_tests(state["target_dir"], file_path)
+        record(subprocess_seconds=report["subprocess_seconds"])
     
-    if "FAILED" in test_output or "ERROR" in test_output:
+    if not report["passed"]:
         print("❌ Tests FAILED. Fixing...")
-        result = f"FAIL\n\nLOGS:\n{test_output}"
+        result = f"FAIL\n\nLOGS:\n{format_failures(report)}"
     else:
         result = "SUCCESS"
         
-    return {
-        "messages": [AIMessage(content=result)],
+    update = {
+        "messages": [agent_message("Judge", result, file_path)],
         "loop_count": state["loop_count"],
         "current_pylint_score": state["current_pylint_score"],
         "previous_pylint_score": state.get("previous_pylint_score")
     }
+    # End of a Fixer -> Judge iteration: remember where it got us and what it cost
+    if state.get("iteration_started") is not None:
+        update["trajectory"] = (state.get("trajectory") or []) + [{
+            "loop": state["loop_count"],
+            "score": state["current_pylint_score"],
+            "previous_score": state.get("previous_pylint_score"),
+            "passed": report["passed"],
+            "failed": report["failed"],
+            "seconds": time.time() - state["iteration_started"],
+            "tokens": state.get("iteration_tokens", 0),
+        }]
+        update["iteration_started"] = None
+    return update
+
+def starting_iteration(node):
+    """
+    Stamps the Fixer's update with the iteration start time and the LLM tokens it
+    used, so the Judge can record what the whole iteration cost.
+    """
+    @functools.wraps(node)
+    def wrapper(state):
+        started = time.time()
+        update = node(state)
+        metrics = current_metrics()
+        update["iteration_started"] = started
+        update["iteration_tokens"] = metrics.get("prompt_tokens", 0) + metrics.get("response_tokens", 0)
+        return update
+    return wrapper
+
+def budgeted(node):
+    """
+    Charges what the node used (LLM tokens, wall time, test subprocess time) to
+    the file's budget in the state and to the run's budget.
+    """
+    @functools.wraps(node)
+    def wrapper(state):
+        start = time.perf_counter()
+        update = node(state)
+        metrics = current_metrics()
+        spent = {
+            "tokens": metrics.get("prompt_tokens", 0) + metrics.get("response_tokens", 0),
+            "seconds": time.perf_counter() - start,
+            "subprocess_seconds": metrics.get("subprocess_seconds", 0),
+        }
+        budget = state.get("budget") or new_file_budget()
+        update["budget"] = {**budget, "used": {key: budget["used"].get(key, 0) + value
+                                               for key, value in spent.items()}}
+        run_budget = get_run_budget()
+        if run_budget is not None:
+            run_budget.charge(spent["tokens"], spent["subprocess_seconds"])
+        return update
+    return wrapper
+
+def budget_exhausted(state, skipping):
+    """
+    True when no budget is left for this file; the event goes to the telemetry stream.
+    """
+    if get_budget_level(state) != "exhausted":
+        return False
+    budget = state.get("budget") or new_file_budget()
+    run_budget = get_run_budget()
+    print(f"💸 Budget exhausted for {os.path.basename(get_file_path(state))}: skipping {skipping}.")
+    get_sink().emit({
+        "event": "budget_exhausted",
+        "timestamp": datetime.datetime.now().isoformat(),
+        "file": state.get("file_path"),
+        "loop": state.get("loop_count"),
+        "skipping": skipping,
+        "file_budget": budget,
+        "run_budget": run_budget.summary() if run_budget is not None else None,
+    })
+    return True
+
+def snapshotting(node):
+    """
+    Adds the file content to the node's state update, so that every checkpoint
+    holds the code that goes with it.
+    """
+    @functools.wraps(node)
+    def wrapper(state):
+        update = node(state)
+        update["file_snapshot"] = read_code(state["target_dir"], get_file_path(state))
+        return update
+    return wrapper
 
 # 5. Decision Logic
 
+def decide_after_triage(state: GraphState):
+    if state["messages"][-1].content.startswith("SUCCESS"):
+        return "end"
+    if budget_exhausted(state, "the Auditor"):
+        return "end"
+    return "auditor"
+
 def decide_after_auditor(state: GraphState):
-    auditor_message = state["messages"][-1].content.lower()
-    if any(keyword in auditor_message for keyword in ["no changes needed", "code is perfect", "no bugs"]):
+    if is_clean_audit(state["messages"][-1].content):
         print("✋ Auditor says code is perfect. Skipping Fixer.")
         return "judge"
+    if budget_exhausted(state, "the Fixer"):
+        return "judge"
     return "fixer"
 
-def should_continue(state: GraphState):
-    last_message = state["messages"][-1].content
-    current_score = state["current_pylint_score"]
-    prev_score = state.get("previous_pylint_score")
-    
-    # A. Check Test Failures
-    if "FAIL" in last_message:
-        return "fixer"
-
-    # B. Check Max Iterations
-    if state["loop_count"] >= 10:
-        print("🛑 Max iterations reached. Stopping.")
-        return "end"
-
-    # C. Check Score Quality
-    if current_score >= 9.5:
-        print(f"👑 Target reached ({current_score}/10). Success!")
-        return "end"
+def needs_reaudit(state):
+    """
+    A large (chunked) file whose tests pass goes back to the Auditor when some of
+    its chunks changed since their audit: only those are re-sent, and the Fixer
+    gets a fresh plan. Skipped when the budget runs low.
+    """
+    audits = state.get("chunk_audits")
+    if not audits or "FAIL" in state["messages"][-1].content or get_budget_level(state) != "ok":
+        return False
+    code = read_code(state["target_dir"], get_file_path(state))
+    return any(chunk["hash"] not in audits for chunk in split_into_chunks(code))
 
-    # D. Check for "Stuck" Score (Diminishing Returns)
-    # If the score is exactly the same as 2 loops ago, we are stuck.
-    if prev_score is not None and current_score == prev_score:
-        print(f"🔄 Score is stuck at {current_score}/10. No improvement detected.")
-        print("🛑 Stopping to prevent infinite loop.")
+def should_continue(state: GraphState):
+    if budget_exhausted(state, "further iterations"):
         return "end"
-
-    # E. Continue Loop
-    print(f"🔄 Score {current_score}/10 needs improvement. Looping...")
-    return "fixer"
+    # The stopping rules are pluggable: see src/convergence.py
+    decision, reason = get_policy(state.get("convergence")).decide(state)
+    if decision == "end":
+        print(f"🛑 {reason} Stopping.")
+    else:
+        print(f"🔄 {reason} Looping...")
+        if needs_reaudit(state):
+            return "auditor"
+    return decision
 
 # 6. Build Graph
-from langgraph.graph import StateGraph, END
 
-def create_swarm_graph():
+def create_swarm_graph(checkpointer=None):
+    from langgraph.graph import StateGraph, END
+
     workflow = StateGraph(GraphState)
-    workflow.add_node("auditor", auditor_node)
-    workflow.add_node("fixer", fixer_node)
-    workflow.add_node("judge", judge_node)
-    workflow.set_entry_point("auditor")
+    workflow.add_node("triage", traced("triage", snapshotting(budgeted(triage_node))))
+    workflow.add_node("auditor", traced("auditor", snapshotting(budgeted(auditor_node))))
+    workflow.add_node("fixer", traced("fixer", snapshotting(budgeted(starting_iteration(fixer_node)))))
+    workflow.add_node("judge", traced("judge", snapshotting(budgeted(judge_node))))
+    workflow.set_entry_point("triage")
+
+    workflow.add_conditional_edges("triage", decide_after_triage, {"auditor": "auditor", "end": END})
 
     workflow.add_conditional_edges("auditor", decide_after_auditor, {"fixer": "fixer", "judge": "judge"})
     workflow.add_edge("fixer", "judge")
     
-    workflow.add_conditional_edges("judge", should_continue, {"fixer": "fixer", "end": END})
+    workflow.add_conditional_edges("judge", should_continue, {"fixer": "fixer", "auditor": "auditor", "end": END})
+
+    return workflow.compile(checkpointer=checkpointer)
+
+# 7. Multi-file Runs
+
+def get_file_status(state):
+    """
+    Summarizes the final state of one per-file pipeline.
+    """
+    if "error" in state:
+        return "CRASHED"
+    if state.get("messages") and "SUCCESS" in state["messages"][-1].content:
+        return "SUCCESS"
+    return "FAILED"
 
-    return workflow.compile()
\ No newline at end of file
+def run_file_checkpointed(initial_state, run_id, resume):
+    """
+    Runs one file's pipeline with its state checkpointed after every node.
+    When resuming, the file is restored from the last checkpoint and the graph
+    continues from the last completed node (a finished file is not re-run).
+    """
+    file_path = initial_state["file_path"]
+    checkpointer = get_checkpointer()
+    app = create_swarm_graph(checkpointer=checkpointer)
+    config = thread_config(run_id, file_path, initial_state["target_dir"])
+
+    saved_state = load_saved_state(checkpointer, config) if resume else None
+    if not saved_state:
+        return app.invoke(initial_state, config)
+
+    print(f"♻️ Resuming {os.path.basename(file_path)} from iteration {saved_state.get('loop_count', 0)}")
+    if saved_state.get("file_snapshot") is not None:
+        write_file_safely(initial_state["target_dir"], os.path.relpath(file_path, initial_state["target_dir"]),
+                          saved_state["file_snapshot"])
+    # Nothing left to run: the file had already finished
+    return app.invoke(None, config) or saved_state
+
+def run_swarm(target_dir, max_workers=DEFAULT_MAX_WORKERS, num_candidates=1, fixer_output="patch",
+              run_id=None, resume=False, convergence=None, file_budget=None, run_budget=None):
+    """
+    Runs one Auditor -> Fixer -> Judge pipeline per source file of target_dir,
+    on a bounded thread pool, and merges the per-file results.
+    With num_candidates > 1 the Fixer keeps the best of N parallel candidates.
+    fixer_output="full" makes the Fixer regenerate whole files instead of patches.
+    With a run_id, every pipeline is checkpointed; resume=True continues that run.
+    `convergence` selects the stopping policy ({"policy": name, **options}).
+    `file_budget` limits each file ({"tokens", "seconds", "subprocess_seconds"}),
+    `run_budget` (a src.budget.RunBudget) all of them together.
+    """
+    app = create_swarm_graph()
+    files = get_source_files(target_dir)
+
+    def run_file(file_path):
+        initial_state = {
+            "messages": [],
+            "target_dir": target_dir,
+            "file_path": file_path,
+            "num_candidates": num_candidates,
+            "fixer_output": fixer_output,
+            "convergence": convergence or {},
+            "budget": new_file_budget(file_budget),
+            "loop_count": 0
+        }
+        try:
+            if run_id:
+                return run_file_checkpointed(initial_state, run_id, resume)
+            return app.invoke(initial_state)
+        except Exception as e:
+            print(f"💥 {os.path.basename(file_path)} crashed: {e}")
+            return {**initial_state, "error": str(e)}
+
+    results = {}
+    set_run_budget(run_budget)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            futures = {pool.submit(run_file, f): f for f in files}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+    finally:
+        set_run_budget(None)
+
+    final_state = {"target_dir": target_dir, "messages": [], "loop_count": 0, "results": {}}
+    # Only the files rewritten above are re-linted, the rest comes from the lint cache
+    final_state["current_pylint_score"] = lint_directory(target_dir)["score"]
+    for file_path in files:
+        state = results[file_path]
+        final_state["messages"] += state.get("messages", [])
+        final_state["loop_count"] += state.get("loop_count", 0)
+        final_state["results"][os.path.relpath(file_path, target_dir)] = {
+            "status": get_file_status(state),
+            "loop_count": state.get("loop_count", 0),
+            "pylint_score": state.get("current_pylint_score"),
+            "final_message": state["messages"][-1].content if state.get("messages") else "",
+            "trajectory": state.get("trajectory", []),
+            "budget": (state.get("budget") or {}).get("used"),
+            "error": state.get("error")
+        }
+    final_state["budget"] = {
+        "file_limits": new_file_budget(file_budget)["limits"],
+        "run": run_budget.summary() if run_budget is not None else None,
+    }
+    return final_state
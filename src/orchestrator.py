@@ -1,3 +1,4 @@
+import asyncio
 import os
 from src.agents.auditor import Auditor
 from src.agents.fixer import Fixer
@@ -29,6 +30,28 @@ class Orchestrator:
         else:
             return False, verdict
 
+    async def aprocess_file(self, file_path):
+        # Même pipeline que process_file, sans bloquer la boucle d'événements
+        with open(file_path, "r", encoding="utf-8") as f:
+            original_code = f.read()
+
+        print(f"--- Analyse de {file_path} ---")
+
+        report = await self.auditor.arun(original_code)
+        fixed_code = await self.fixer.arun(original_code, report)
+        verdict = await self.judge.arun(original_code, fixed_code)
+
+        if "PASS" in verdict.upper():
+            self._save_changes(file_path, fixed_code)
+            return True, verdict
+        return False, verdict
+
+    def process_files(self, file_paths):
+        # Plusieurs fichiers en parallèle : le client partagé limite les requêtes simultanées
+        async def run_all():
+            return await asyncio.gather(*(self.aprocess_file(p) for p in file_paths))
+        return asyncio.run(run_all())
+
     def _save_changes(self, file_path, new_code):
         with open(file_path, "w", encoding="utf-8") as f:
             f.write(new_code)
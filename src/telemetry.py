@@ -1,10 +1,113 @@
 import json
+import contextvars
 import datetime
+import functools
 import os
+import threading
+import time
+from contextlib import contextmanager
+from src.utils.logger import get_sink
 
-def save_experiment_data(initial_state, final_state, start_time, end_time):
+# Spans currently open in this thread / asyncio task (innermost last)
+_open_spans = contextvars.ContextVar("open_spans", default=())
+
+# Per-span-name totals of the run, summarized in experiment_data.json
+_span_totals = {}
+# Metrics of the outermost spans only (each LLM call counted once, whatever the nesting)
+_run_metrics = {}
+_totals_lock = threading.Lock()
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Times a block and emits it as a structured "span" event.
+    Metrics recorded inside the block with record() are added to every enclosing span,
+    so a node span also carries the LLM and subprocess time of its tool calls.
+    """
+    event = {
+        "event": "span",
+        "name": name,
+        "timestamp": datetime.datetime.now().isoformat(),
+        **attributes,
+        "metrics": {}
+    }
+    token = _open_spans.set(_open_spans.get() + (event,))
+    start = time.perf_counter()
+    try:
+        yield event
+    except Exception as e:
+        event["error"] = str(e)
+        raise
+    finally:
+        _open_spans.reset(token)
+        event["duration_seconds"] = time.perf_counter() - start
+        _add_to_totals(event, outermost=not _open_spans.get())
+        get_sink().emit(event)
+
+def record(**metrics):
+    """
+    Adds numeric metrics (llm_seconds, prompt_tokens, subprocess_seconds...) to the open spans.
+    """
+    for event in _open_spans.get():
+        for key, value in metrics.items():
+            event["metrics"][key] = event["metrics"].get(key, 0) + value
+
+def current_metrics():
+    """
+    Metrics recorded so far in the innermost open span (e.g. the tokens of the current node).
+    """
+    spans = _open_spans.get()
+    return dict(spans[-1]["metrics"]) if spans else {}
+
+def _add_to_totals(event, outermost=False):
+    with _totals_lock:
+        totals = _span_totals.setdefault(event["name"], {"count": 0, "duration_seconds": 0.0})
+        totals["count"] += 1
+        totals["duration_seconds"] += event["duration_seconds"]
+        for key, value in event["metrics"].items():
+            totals[key] = totals.get(key, 0) + value
+            if outermost:
+                _run_metrics[key] = _run_metrics.get(key, 0) + value
+
+def get_span_totals():
+    with _totals_lock:
+        return {name: dict(totals) for name, totals in _span_totals.items()}
+
+def reset_span_totals():
+    with _totals_lock:
+        _span_totals.clear()
+        _run_metrics.clear()
+
+def get_prompt_cache_stats():
+    """
+    How often the LLM prompts reused a prefix already cached by the backend
+    (instructions + unchanged code), and the input tokens it saved.
+    """
+    with _totals_lock:
+        hits = _run_metrics.get("prefix_cache_hits", 0)
+        misses = _run_metrics.get("prefix_cache_misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "cached_prompt_tokens": _run_metrics.get("cached_prompt_tokens", 0),
+            "sent_prompt_tokens": _run_metrics.get("prompt_tokens", 0),
+        }
+
+def traced(name, node):
+    """
+    Wraps a graph node in a span tagged with the file and iteration it works on.
+    """
+    @functools.wraps(node)
+    def wrapper(state):
+        with span(name, file=state.get("file_path"), loop=state.get("loop_count")):
+            return node(state)
+    return wrapper
+
+def save_experiment_data(initial_state, final_state, start_time, end_time, output_path=None):
     """
     Records the execution of the swarm in experiment_data.json
+    (or output_path, e.g. one file per target of a batch run)
     """
     
     # 1. Prepare the Data Structure
@@ -14,9 +117,14 @@ def save_experiment_data(initial_state, final_state, start_time, end_time):
             "end_time": datetime.datetime.fromtimestamp(end_time).isoformat(),
             "duration_seconds": end_time - start_time,
             "target_dir": initial_state["target_dir"],
-            "total_iterations": final_state.get("loop_count", 0)
+            "total_iterations": final_state.get("loop_count", 0),
+            "final_pylint_score": final_state.get("current_pylint_score")
         },
+        "timings": get_span_totals(), # Time / tokens per node and tool
+        "prompt_cache": get_prompt_cache_stats(), # Prompt prefixes reused by the backend
         "history": [], # We will fill this with agent actions
+        "files": final_state.get("results", {}), # Per-file outcome of multi-file runs
+        "budget": final_state.get("budget"), # Budget limits and what the run consumed
         "result": {
             "status": "FAILED",
             "final_message": "",
@@ -25,8 +133,8 @@ def save_experiment_data(initial_state, final_state, start_time, end_time):
     }
 
     # 2. Convert LangGraph messages to a readable log format
-    # We iterate over the messages in the final state to build the history
-    # 2. Convert LangGraph messages to a readable log format
+    # The state only keeps the last messages of each file; the complete history
+    # is in the "message" events of logs/experiment_data.jsonl
     for msg in final_state.get("messages", []):
         agent_type = "Unknown"
         content_preview = ""
@@ -34,8 +142,10 @@ def save_experiment_data(initial_state, final_state, start_time, end_time):
         if hasattr(msg, 'content'):
             content_preview = msg.content[:200] + "..." if len(msg.content) > 200 else msg.content
             
-            # We look for keywords we know are in the graph.py messages
-            if "Code updated" in msg.content or "Error writing file" in msg.content:
+            # Messages produced by graph.py carry the agent name; older ones are guessed
+            if getattr(msg, "name", None):
+                agent_type = msg.name
+            elif "Code updated" in msg.content or "Error writing file" in msg.content:
                 agent_type = "Fixer"
             elif "SUCCESS" in msg.content or "FAIL" in msg.content or "LOGS" in msg.content:
                 agent_type = "Judge"
@@ -46,7 +156,7 @@ def save_experiment_data(initial_state, final_state, start_time, end_time):
         entry = {
             "agent": agent_type,
             "type": type(msg).__name__,
-            "timestamp": datetime.datetime.now().isoformat(),
+            "timestamp": getattr(msg, "additional_kwargs", {}).get("timestamp") or datetime.datetime.now().isoformat(),
             "content_preview": content_preview
         }
         data["history"].append(entry)
@@ -54,6 +164,12 @@ def save_experiment_data(initial_state, final_state, start_time, end_time):
     if "error" in final_state:
         data["result"]["status"] = "CRASHED"
         data["result"]["error"] = final_state["error"]
+    elif final_state.get("results"):
+        statuses = [r["status"] for r in final_state["results"].values()]
+        if all(status == "SUCCESS" for status in statuses):
+            data["result"]["status"] = "SUCCESS"
+        else:
+            data["result"]["status"] = f"FAILED ({statuses.count('SUCCESS')}/{len(statuses)} files succeeded)"
     elif final_state.get("messages"):
         last_msg = final_state["messages"][-1].content
         if "SUCCESS" in last_msg:
@@ -64,9 +180,13 @@ def save_experiment_data(initial_state, final_state, start_time, end_time):
     data["result"]["final_message"] = final_state.get("messages", [])[-1].content if final_state.get("messages") else ""
 
     # 4. Write to file
-    
-    output_path = os.path.join("logs", "experiment_data.json")
+    # The run summary also goes to the JSONL telemetry stream (background thread)
+    get_sink().emit({"event": "run_summary", "timestamp": datetime.datetime.now().isoformat(), **data})
+
+    output_path = output_path or os.path.join("logs", "experiment_data.json")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=4)
     
-    print(f"✅ Telemetry saved to {output_path}")
\ No newline at end of file
+    print(f"✅ Telemetry saved to {output_path}")
+    return data
\ No newline at end of file
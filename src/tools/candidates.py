@@ -0,0 +1,61 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from src.tools.lint_engine import lint_file
+from src.tools.pytest_runner import run_affected_tests
+from src.tools.workspace import Workspace
+
+
+def evaluate_candidate(workspace, rel_path, code):
+    """
+    Lints and tests one candidate in a scratch workspace, leaving the real files untouched.
+    The workspace is rolled back afterwards, ready for the next candidate.
+    """
+    snapshot = workspace.snapshot()
+    try:
+        workspace.write(rel_path, code)
+        scratch_file = workspace.file_path(rel_path)
+        lint = lint_file(scratch_file)
+        report = run_affected_tests(workspace.path, scratch_file)
+    finally:
+        workspace.rollback(snapshot)
+
+    return {"code": code, "score": lint["score"], "passed": report["passed"], "report": report}
+
+
+def evaluate_candidates(target_dir, rel_path, candidates, max_workers=4):
+    """
+    Evaluates all candidates in parallel. Each worker gets one hard-linked
+    workspace of target_dir and reuses it (with a rollback) for its next candidate.
+    """
+    if not candidates:
+        return []
+    workers = max(1, min(max_workers, len(candidates)))
+    workspaces = queue.Queue()
+    for _ in range(workers):
+        workspaces.put(Workspace(target_dir))
+
+    def evaluate(code):
+        workspace = workspaces.get()
+        try:
+            return evaluate_candidate(workspace, rel_path, code)
+        finally:
+            workspaces.put(workspace)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(evaluate, candidates))
+    finally:
+        while not workspaces.empty():
+            workspaces.get().close()
+
+
+def pick_best(results):
+    """
+    Highest pylint score among the candidates passing their tests,
+    or among all of them if none passes.
+    """
+    if not results:
+        return None
+    passing = [r for r in results if r["passed"]]
+    return max(passing or results, key=lambda r: r["score"])
@@ -0,0 +1,54 @@
+import ast
+import hashlib
+
+# Files shorter than this are audited in one piece, as before
+CHUNK_MIN_LINES = 200
+
+
+def _hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def split_into_chunks(code, min_lines=CHUNK_MIN_LINES):
+    """
+    Splits a module into audit chunks: one per top-level function or class, plus a
+    "module" chunk for the remaining top-level statements. Imports are attached to
+    every chunk as context. Small or unparsable files give a single "file" chunk.
+
+    Each chunk is {"kind", "name", "source", "hash"}; the hash covers the source
+    the Auditor sees, so an unchanged chunk keeps the same hash between iterations.
+    """
+    whole = [{"kind": "file", "name": "", "source": code, "hash": _hash(code)}]
+    if len(code.splitlines()) < min_lines:
+        return whole
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return whole
+
+    lines = code.splitlines()
+
+    def source_of(node):
+        start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+        return "\n".join(lines[start - 1:node.end_lineno])
+
+    imports = [source_of(n) for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+    context = "\n".join(imports)
+
+    chunks = []
+    module_statements = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            kind = "class" if isinstance(node, ast.ClassDef) else "function"
+            chunks.append((kind, node.name, source_of(node)))
+        elif not isinstance(node, (ast.Import, ast.ImportFrom)):
+            module_statements.append(source_of(node))
+    if module_statements:
+        chunks.append(("module", "", "\n\n".join(module_statements)))
+
+    result = []
+    for kind, name, source in chunks:
+        if context:
+            source = f"{context}\n\n{source}"
+        result.append({"kind": kind, "name": name, "source": source, "hash": _hash(source)})
+    return result or whole
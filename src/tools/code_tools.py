@@ -1,5 +1,8 @@
 import os
+import re
+import shutil
 import subprocess
+import threading
 
 def write_file_safely(target_dir, filename, content):
     """
@@ -23,9 +26,15 @@ def write_file_safely(target_dir, filename, content):
         raise PermissionError(f"Security Alert: Attempt to write outside sandbox. Target: {norm_target}, Requested: {norm_full}")
 
     # 5. Write the file
-    with open(full_path, 'w', encoding='utf-8') as f:
+    # Written next to it then swapped in: readers never see a half-written file,
+    # and a hard-linked file (see workspace.py) is replaced instead of modified
+    tmp_path = f"{full_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         f.write(content)
-    
+    if os.path.exists(full_path):
+        shutil.copymode(full_path, tmp_path)
+    os.replace(tmp_path, full_path)
+
     return f"Successfully wrote {filename}"
 
 def run_pytest(target_dir):
@@ -71,4 +80,13 @@ def run_pylint(target_dir):
     except FileNotFoundError:
         return "Error: pylint command not found. Make sure it is installed."
     except subprocess.TimeoutExpired:
-        return "Error: Pylint timed out."
\ No newline at end of file
+        return "Error: Pylint timed out."
+
+def extract_pylint_score(pylint_output):
+    """
+    Extracts the "rated at X/10" score from pylint's text output.
+    """
+    match = re.search(r'rated at (\d+\.\d+)', pylint_output)
+    if match:
+        return float(match.group(1))
+    return 0.0
@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+import time
+
+# Eviction limits, as for the LLM response cache: entries not used for
+# MAX_AGE_SECONDS are dropped, then the least recently used ones until the
+# directory fits in MAX_SIZE_BYTES.
+MAX_AGE_SECONDS = 7 * 24 * 3600
+MAX_SIZE_BYTES = 50 * 1024 * 1024
+# Scanning the whole directory is not free: evict on the first write of the
+# process, then every EVICT_EVERY writes
+EVICT_EVERY = 100
+
+
+class JsonFileCache:
+    """
+    On-disk cache of JSON values, one file per key (a hex digest), sharded by the
+    first two hex digits to keep directories small. Safe to share between threads
+    and processes: entries are written atomically.
+
+    Reading an entry refreshes its modification time, which is used as the last
+    access time by the eviction.
+    """
+
+    def __init__(self, cache_dir, max_age=MAX_AGE_SECONDS, max_size=MAX_SIZE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, json.JSONDecodeError):
+            return None
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        # Atomic, so concurrent workers never read a half-written entry
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            evict = self._writes % EVICT_EVERY == 0
+            self._writes += 1
+        if evict:
+            self.evict()
+
+    def evict(self):
+        now = time.time()
+        entries = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # removed by another process meanwhile
+                if name.endswith(".json"):
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                elif now - stat.st_mtime > 3600:
+                    entries.append((0.0, stat.st_size, path))  # temp file left by a killed writer
+
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in sorted(entries):
+            if now - mtime <= self.max_age and total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,211 @@
+import functools
+import glob
+import hashlib
+import os
+import threading
+from types import SimpleNamespace
+
+from src.tools.code_tools import run_pylint, extract_pylint_score
+from src.tools.json_cache import JsonFileCache
+
+LINT_CACHE_DIR = os.path.join(".swarm_cache", "lint")
+
+# Options of every in-process lint (part of the cache key)
+LINT_OPTIONS = ["--persistent=n", "--reports=n", "--score=y"]
+# Configuration files looked for in the working directory without pylint's own finder
+CONFIG_FILES = ("pylintrc", ".pylintrc", "pyproject.toml", "setup.cfg", "tox.ini")
+
+
+@functools.lru_cache(maxsize=None)
+def load_pylint():
+    """
+    Imports pylint's API on the first lint rather than with this module (it is
+    slow to import). None when pylint is not importable: the subprocess runner is used.
+    """
+    try:
+        from astroid import MANAGER
+        from pylint import __version__
+        from pylint.config import find_default_config_files
+        from pylint.lint import Run
+        from pylint.reporters import CollectingReporter
+    except ImportError:
+        return None
+    return SimpleNamespace(manager=MANAGER, version=__version__, Run=Run,
+                           CollectingReporter=CollectingReporter, find_config_files=find_default_config_files)
+
+
+def config_fingerprint():
+    """
+    Hash of the pylint configuration that a lint started now would use: the
+    configuration files found from the working directory (pylintrc, pyproject.toml,
+    setup.cfg... which may also load plugins), PYLINTRC, and our own options.
+    """
+    pylint = load_pylint()
+    if pylint is not None:
+        files = [str(path) for path in pylint.find_config_files()]
+    else:
+        files = [name for name in CONFIG_FILES if os.path.isfile(name)]
+    if os.environ.get("PYLINTRC"):
+        files.append(os.environ["PYLINTRC"])
+
+    digest = hashlib.sha256("\0".join(LINT_OPTIONS).encode("utf-8"))
+    for path in files:
+        digest.update(f"\0{os.path.abspath(path)}\0".encode("utf-8"))
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            pass
+    return digest.hexdigest()
+
+
+def compute_score(stats):
+    """
+    pylint's default evaluation formula, applied to (possibly summed) message counts.
+    """
+    if stats.get("fatal"):
+        return 0.0
+    if not stats.get("statement"):
+        return 0.0
+    weighted = 5 * stats["error"] + stats["warning"] + stats["refactor"] + stats["convention"]
+    return round(max(0.0, 10.0 - (weighted / stats["statement"]) * 10), 2)
+
+
+class LintCache(JsonFileCache):
+    """
+    Lint results persisted between runs, one JSON file per (file name, content) hash.
+
+    The key holds the file name, not its directory: the same module linted in a
+    scratch workspace (best-of-N candidates) or a temporary copy shares its entry.
+    It also holds the pylint version and configuration (see config_fingerprint),
+    so editing a pylintrc invalidates the stored scores.
+    A result only depends on the file itself here: messages caused by changes in
+    *other* modules (e.g. a removed import target) are picked up once the file
+    itself changes.
+    """
+
+    def __init__(self, cache_dir=LINT_CACHE_DIR, **limits):
+        super().__init__(cache_dir, **limits)
+
+    def make_key(self, file_path, content):
+        digest = hashlib.sha256()
+        pylint = load_pylint()
+        version = pylint.version if pylint else "subprocess"
+        digest.update(f"{version}\0{config_fingerprint()}\0{os.path.basename(file_path)}\0".encode("utf-8"))
+        digest.update(content)
+        return digest.hexdigest()
+
+
+class LintEngine:
+    """
+    Runs pylint inside the current process.
+
+    The astroid manager is a process-wide singleton, so the ASTs of the standard
+    library and third-party imports built during one lint are reused by the next
+    one. Only the linted file itself is evicted from the cache, since it changes
+    between iterations.
+    """
+
+    def __init__(self, cache=None):
+        # pylint keeps global state (astroid cache, sys.path tweaks): one lint at a time
+        self._lock = threading.Lock()
+        self.cache = cache or LintCache()
+
+    def _invalidate(self, manager, file_path):
+        stale = [
+            name for name, module in manager.astroid_cache.items()
+            if module.file and os.path.abspath(module.file) == file_path
+        ]
+        for name in stale:
+            del manager.astroid_cache[name]
+
+    def lint_file(self, file_path):
+        """
+        Lints a single file and returns {"score", "messages", "stats"}.
+        Unchanged files are answered from the lint cache.
+        """
+        file_path = os.path.abspath(file_path)
+        with open(file_path, "rb") as f:
+            key = self.cache.make_key(file_path, f.read())
+        result = self.cache.get(key)
+        if result is None:
+            result = self._lint(file_path)
+            if result["stats"]:  # subprocess fallback errors are not worth keeping
+                self.cache.put(key, result)
+        else:
+            # The entry may come from a copy of the file in another directory
+            for message in result["messages"]:
+                message["path"] = file_path
+        return result
+
+    def lint_directory(self, target_dir):
+        """
+        Lints every Python file of target_dir (tests included, like `pylint target_dir`),
+        re-analyzing only the files whose content changed, and recomputes the
+        directory score from the per-file statistics.
+        """
+        files = sorted(glob.glob(os.path.join(target_dir, "*.py")))
+        per_file = {f: self.lint_file(f) for f in files}
+
+        totals = {"statement": 0, "fatal": 0, "error": 0, "warning": 0, "refactor": 0, "convention": 0}
+        for result in per_file.values():
+            for name in totals:
+                totals[name] += result["stats"].get(name, 0)
+
+        return {"score": compute_score(totals), "stats": totals, "files": per_file}
+
+    def _lint(self, file_path):
+        pylint = load_pylint()
+        if pylint is None:
+            return self._lint_subprocess(file_path)
+
+        with self._lock:
+            self._invalidate(pylint.manager, file_path)
+            reporter = pylint.CollectingReporter()
+            run = pylint.Run([file_path, *LINT_OPTIONS], reporter=reporter, exit=False)
+            stats = run.linter.stats
+
+        return {
+            "score": round(float(stats.global_note or 0.0), 2),
+            "messages": [
+                {
+                    "msg_id": m.msg_id,
+                    "symbol": m.symbol,
+                    "category": m.category,
+                    "line": m.line,
+                    "column": m.column,
+                    "message": m.msg,
+                    "path": m.path,
+                }
+                for m in reporter.messages
+            ],
+            "stats": {
+                "statement": stats.statement,
+                "fatal": stats.fatal,
+                "error": stats.error,
+                "warning": stats.warning,
+                "refactor": stats.refactor,
+                "convention": stats.convention,
+            },
+        }
+
+    def _lint_subprocess(self, file_path):
+        output = run_pylint(file_path)
+        return {"score": extract_pylint_score(output), "messages": [], "stats": {}, "output": output}
+
+
+_engine = LintEngine()
+
+
+def lint_file(file_path):
+    """
+    Lints one file with the shared in-process engine.
+    """
+    return _engine.lint_file(file_path)
+
+
+def lint_directory(target_dir):
+    """
+    Lints a whole directory with the shared engine and its cache.
+    """
+    return _engine.lint_directory(target_dir)
@@ -0,0 +1,219 @@
+import ast
+import re
+
+
+class PatchError(Exception):
+    """The Fixer output could not be applied to the original code."""
+
+
+def _node_start(node):
+    # Decorators are part of the definition
+    return min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+
+
+def _has_docstring(tree):
+    return (tree.body and isinstance(tree.body[0], ast.Expr)
+            and isinstance(tree.body[0].value, ast.Constant)
+            and isinstance(tree.body[0].value.value, str))
+
+
+def _assigned_names(node):
+    """
+    Names bound by a simple top-level assignment (LIMIT = 20, LIMIT: int = 20,
+    A, B = 3, 4), as a tuple; None for any other statement.
+    """
+    if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+        return (node.target.id,)
+    if not isinstance(node, ast.Assign) or len(node.targets) != 1:
+        return None
+    target = node.targets[0]
+    if isinstance(target, ast.Name):
+        return (target.id,)
+    if isinstance(target, (ast.Tuple, ast.List)) and all(isinstance(e, ast.Name) for e in target.elts):
+        return tuple(e.id for e in target.elts)
+    return None
+
+
+# Top-level statements with a body, matched on their first line (if __name__ == "__main__":)
+COMPOUND_STATEMENTS = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.With, ast.AsyncWith, ast.Try)
+
+
+def _parse(code, what):
+    try:
+        return ast.parse(code)
+    except SyntaxError as e:
+        raise PatchError(f"{what} is not valid Python: {e}") from e
+
+
+def apply_function_patches(original, patch_code):
+    """
+    Applies a function-level patch: every top-level function or class of patch_code
+    replaces the one with the same name in original (or is appended if new), and
+    so does every simple top-level assignment (LIMIT = 20). New imports are
+    inserted after the existing ones, and a module docstring replaces the original
+    one (or is added at the very top). A compound statement (if __name__ == ...:)
+    replaces the original one with the same first line.
+
+    Any other changed top-level statement raises PatchError: appending it would
+    leave the old version running too.
+    """
+    original_tree = _parse(original, "Original code")
+    patch_tree = _parse(patch_code, "Patch")
+    lines = original.splitlines()
+    patch_lines = patch_code.splitlines()
+
+    def patch_source(node):
+        return patch_lines[_node_start(node) - 1:node.end_lineno]
+
+    def header(node, source_lines):
+        return " ".join(source_lines[node.lineno - 1].split())
+
+    definitions = {
+        node.name: node for node in original_tree.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+    }
+    # The last assignment of a name is the one in effect
+    assignments = {_assigned_names(node): node for node in original_tree.body if _assigned_names(node)}
+    assigned = {name for names in assignments for name in names}
+    compounds = {
+        header(node, lines): node for node in original_tree.body if isinstance(node, COMPOUND_STATEMENTS)
+    }
+    # (start, end, new lines) replacements on the original, applied bottom-up
+    replacements = []
+    # Docstring added to a module that had none: goes above everything, imports included
+    prologue = []
+    appended = []
+    new_imports = []
+    existing = {line.strip() for line in lines}
+
+    for index, node in enumerate(patch_tree.body):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            target = definitions.get(node.name)
+            if target is not None:
+                replacements.append((_node_start(target) - 1, target.end_lineno, patch_source(node)))
+            else:
+                appended += [""] * 2 + patch_source(node)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            new_imports += [l for l in patch_source(node) if l.strip() not in existing]
+        elif index == 0 and _has_docstring(patch_tree):
+            if _has_docstring(original_tree):
+                docstring = original_tree.body[0]
+                replacements.append((docstring.lineno - 1, docstring.end_lineno, patch_source(node)))
+            else:
+                prologue = patch_source(node) + [""]
+        elif _assigned_names(node) in assignments:
+            target = assignments[_assigned_names(node)]
+            replacements.append((target.lineno - 1, target.end_lineno, patch_source(node)))
+        elif isinstance(node, COMPOUND_STATEMENTS) and header(node, patch_lines) in compounds:
+            target = compounds[header(node, patch_lines)]
+            replacements.append((target.lineno - 1, target.end_lineno, patch_source(node)))
+        elif all(l.strip() in existing for l in patch_source(node)):
+            continue  # Unchanged statement repeated for context
+        elif _assigned_names(node) and not assigned & set(_assigned_names(node)):
+            appended += [""] + patch_source(node)  # New constant
+        else:
+            raise PatchError(f"Cannot place the changed top-level statement at line {node.lineno} of the patch")
+
+    if new_imports:
+        imports = [n for n in original_tree.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+        if imports:
+            position = imports[-1].end_lineno
+        else:
+            # First imports of the module: after the docstring, followed by a blank line
+            position = original_tree.body[0].end_lineno if _has_docstring(original_tree) else 0
+            new_imports.append("")
+        replacements.append((position, position, new_imports))
+
+    main_block = original_tree.body[-1] if original_tree.body else None
+    if appended and isinstance(main_block, ast.If) and header(main_block, lines).startswith("if __name__"):
+        # New definitions must exist before the script part runs
+        position = main_block.lineno - 1
+        while appended and not appended[0]:
+            appended.pop(0)
+        replacements.append((position, position, appended + ["", ""]))
+        appended = []
+
+    for start, end, new_lines in sorted(replacements, key=lambda r: (r[0], r[1]), reverse=True):
+        lines[start:end] = new_lines
+
+    result = "\n".join(prologue + lines + appended) + "\n"
+    _parse(result, "Patched code")
+    return result
+
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+
+
+def _parse_hunks(diff_text):
+    hunks = []
+    current = None
+    for line in diff_text.splitlines():
+        match = HUNK_HEADER.match(line)
+        if match:
+            current = {"start": int(match.group(1)), "old": [], "new": []}
+            hunks.append(current)
+        elif current is None or line.startswith(("---", "+++")):
+            continue
+        elif line.startswith("-"):
+            current["old"].append(line[1:])
+        elif line.startswith("+"):
+            current["new"].append(line[1:])
+        elif line.startswith("\\"):
+            continue  # "\ No newline at end of file"
+        else:
+            # Context line (models sometimes drop the leading space of empty lines)
+            text = line[1:] if line.startswith(" ") else line
+            current["old"].append(text)
+            current["new"].append(text)
+    return hunks
+
+
+def _find(lines, block, hint, start):
+    # Trust the header line number first, then search from the previous hunk onwards
+    # (and finally before it): models often get line numbers wrong but the context right
+    if lines[hint:hint + len(block)] == block and hint >= start:
+        return hint
+    for i in [*range(start, len(lines) - len(block) + 1), *range(0, start)]:
+        if lines[i:i + len(block)] == block:
+            return i
+    return -1
+
+
+def apply_unified_diff(original, diff_text):
+    """
+    Applies a unified diff, locating each hunk by its context rather than trusting line numbers.
+    """
+    hunks = _parse_hunks(diff_text)
+    if not hunks:
+        raise PatchError("Diff contains no hunk")
+
+    lines = original.splitlines()
+    offset = 0
+    search_from = 0
+    for number, hunk in enumerate(hunks, start=1):
+        position = _find(lines, hunk["old"], hunk["start"] - 1 + offset, search_from)
+        if position < 0:
+            raise PatchError(f"Hunk #{number} does not match the original code")
+        lines[position:position + len(hunk["old"])] = hunk["new"]
+        offset += len(hunk["new"]) - len(hunk["old"])
+        search_from = position + len(hunk["new"])
+
+    result = "\n".join(lines) + "\n"
+    _parse(result, "Patched code")
+    return result
+
+
+def apply_fixer_output(original, llm_output):
+    """
+    Turns a patch-mode Fixer answer into the new file content: a ```diff block is
+    applied as a unified diff, ```python blocks (or bare code) as function-level patches.
+    """
+    diff = re.search(r"```diff\n(.*?)```", llm_output, re.DOTALL)
+    if diff:
+        return apply_unified_diff(original, diff.group(1))
+
+    blocks = re.findall(r"```python\n(.*?)```", llm_output, re.DOTALL)
+    patch_code = "\n\n".join(blocks) if blocks else llm_output
+    if patch_code.lstrip().startswith(("--- ", "@@ ")):
+        return apply_unified_diff(original, patch_code)
+    return apply_function_patches(original, patch_code)
@@ -0,0 +1,164 @@
+import atexit
+import glob
+import io
+import multiprocessing
+import os
+import queue
+import sys
+import sysconfig
+import tempfile
+import threading
+from contextlib import redirect_stderr, redirect_stdout
+
+
+def _installed_roots():
+    paths = sysconfig.get_paths()
+    roots = {paths["stdlib"], paths["platstdlib"], paths["purelib"], paths["platlib"]}
+    return tuple(os.path.abspath(root) + os.sep for root in roots)
+
+
+def _purge_user_modules(installed_roots):
+    """
+    Forgets every module that does not come from the standard library or an
+    installed package, so the next import re-reads the files the Fixer changed
+    (and never reuses a same-named module from another target directory).
+    pytest, its plugins and third-party packages stay loaded.
+    """
+    for name, module in list(sys.modules.items()):
+        file_path = getattr(module, "__file__", None)
+        if file_path and not os.path.abspath(file_path).startswith(installed_roots):
+            del sys.modules[name]
+
+
+def _worker_main(conn):
+    # Paid once per worker instead of once per Judge iteration
+    import pytest
+
+    installed_roots = _installed_roots()
+    # pytest prepends each test directory to sys.path: start every run from a clean copy
+    base_sys_path = list(sys.path)
+
+    while True:
+        test_files = conn.recv()
+        if test_files is None:
+            break
+        _purge_user_modules(installed_roots)
+        sys.path[:] = base_sys_path
+
+        output = io.StringIO()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            xml_path = os.path.join(tmp_dir, "report.xml")
+            with redirect_stdout(output), redirect_stderr(output):
+                try:
+                    pytest.main([*test_files, "-q", "-p", "no:cacheprovider", f"--junitxml={xml_path}"])
+                except Exception as e:
+                    print(f"Error: pytest crashed in the worker: {e}")
+            xml_report = None
+            if os.path.exists(xml_path):
+                with open(xml_path, "r", encoding="utf-8") as f:
+                    xml_report = f.read()
+        conn.send((xml_report, output.getvalue()))
+
+
+def can_reuse_worker(target_dir):
+    """
+    Reloading is unsafe for native extensions (they cannot be unloaded), and can be
+    turned off with SWARM_COLD_TESTS=1; callers then use a fresh pytest process.
+    """
+    if os.getenv("SWARM_COLD_TESTS", "").lower() in ("1", "true", "yes"):
+        return False
+    for pattern in ("*.so", "*.pyd"):
+        if glob.glob(os.path.join(target_dir, "**", pattern), recursive=True):
+            return False
+    return True
+
+
+class WorkerCrashed(Exception):
+    """The worker process died while running tests; the caller should fall back to a cold run."""
+
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+
+
+class PytestWorkerPool:
+    """
+    Long-lived pytest worker processes. Each request purges the user modules
+    in the worker and re-runs the given test files with pytest.main.
+    """
+
+    def __init__(self, size):
+        # "spawn": forking a process that runs graph threads is not safe
+        self._ctx = multiprocessing.get_context("spawn")
+        # LIFO: reuse the most recently used worker, whose caches are the warmest
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._workers = []
+        for _ in range(size):
+            self._add_worker()
+
+    def _add_worker(self):
+        worker = _Worker(self._ctx)
+        with self._lock:
+            self._workers.append(worker)
+        self._idle.put(worker)
+
+    def _replace(self, worker):
+        worker.process.kill()
+        worker.process.join()
+        with self._lock:
+            self._workers.remove(worker)
+        self._add_worker()
+
+    def run(self, test_files, timeout):
+        """
+        Returns (junit xml text or None, output), or None if the tests timed out.
+        Raises WorkerCrashed if the worker died.
+        """
+        worker = self._idle.get()
+        try:
+            worker.conn.send(test_files)
+            if not worker.conn.poll(timeout):
+                # A stuck test would poison the worker: kill it and start a fresh one
+                self._replace(worker)
+                return None
+            result = worker.conn.recv()
+        except (EOFError, OSError, BrokenPipeError) as e:
+            self._replace(worker)
+            raise WorkerCrashed(str(e)) from e
+        self._idle.put(worker)
+        return result
+
+    def close(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.stop()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool(size):
+    """
+    Returns the process-wide pool, starting it on first use.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PytestWorkerPool(size)
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,247 @@
+import ast
+import glob
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+from src.tools.json_cache import JsonFileCache
+from src.tools.pytest_pool import WorkerCrashed, can_reuse_worker, get_worker_pool
+
+# Timeout of one shard (one pytest process), in seconds
+TEST_TIMEOUT = 30
+MAX_TEST_WORKERS = 4
+
+TEST_CACHE_DIR = os.path.join(".swarm_cache", "tests")
+
+
+def module_name(file_path, target_dir):
+    """
+    Dotted module name of a file relative to target_dir ("pkg/mod.py" -> "pkg.mod").
+    """
+    rel_path = os.path.relpath(file_path, target_dir)
+    return os.path.splitext(rel_path)[0].replace(os.sep, ".")
+
+
+def get_local_imports(file_path, local_modules):
+    """
+    Returns the modules of target_dir imported by a file.
+    """
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+    except (OSError, SyntaxError, ValueError):
+        return set()
+
+    imported = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            # "from pkg import mod" may import a submodule
+            names = [node.module] + [f"{node.module}.{alias.name}" for alias in node.names]
+        else:
+            continue
+        for name in names:
+            # Both "pkg.mod" and its short name "mod" (test dir on sys.path) can match
+            for candidate in (name, name.split(".")[-1]):
+                if candidate in local_modules:
+                    imported.add(local_modules[candidate])
+    return imported
+
+
+def find_affected_tests(target_dir, changed_file):
+    """
+    Test files of target_dir that import changed_file, directly or through other local modules.
+    """
+    files = sorted(glob.glob(os.path.join(target_dir, "**", "*.py"), recursive=True))
+    local_modules = {}
+    for f in files:
+        name = module_name(f, target_dir)
+        local_modules[name] = f
+        local_modules.setdefault(name.split(".")[-1], f)
+
+    imports = {f: get_local_imports(f, local_modules) for f in files}
+    changed_file = os.path.abspath(changed_file)
+
+    def depends_on_changed(f, seen):
+        if os.path.abspath(f) == changed_file:
+            return True
+        seen.add(f)
+        return any(dep not in seen and depends_on_changed(dep, seen) for dep in imports[f])
+
+    tests = [f for f in files if os.path.basename(f).startswith("test_")]
+    return [t for t in tests if depends_on_changed(t, set())]
+
+
+def parse_junit_report(xml_text):
+    """
+    Reads a pytest --junitxml report into {"total", "failed", "skipped", "failures"}.
+    """
+    root = ET.fromstring(xml_text)
+    report = {"total": 0, "failed": 0, "skipped": 0, "failures": []}
+    for case in root.iter("testcase"):
+        report["total"] += 1
+        for outcome in ("failure", "error"):
+            problem = case.find(outcome)
+            if problem is not None:
+                report["failed"] += 1
+                report["failures"].append({
+                    "test": f"{case.get('classname')}::{case.get('name')}",
+                    "kind": outcome,
+                    "message": problem.get("message", ""),
+                    "details": problem.text or "",
+                })
+                break
+        else:
+            if case.find("skipped") is not None:
+                report["skipped"] += 1
+    return report
+
+
+def _timeout_report(test_files):
+    return {"total": 0, "failed": 1, "skipped": 0, "output": "Error: Tests timed out.",
+            "failures": [{"test": " ".join(test_files), "kind": "timeout",
+                          "message": f"Tests timed out after {TEST_TIMEOUT}s", "details": ""}]}
+
+
+def _build_report(test_files, xml_text, output):
+    if xml_text is None:
+        # pytest crashed before writing its report (bad arguments, internal error...)
+        return {"total": 0, "failed": 1, "skipped": 0, "output": output,
+                "failures": [{"test": " ".join(test_files), "kind": "error",
+                              "message": "pytest did not produce a report", "details": output}]}
+    report = parse_junit_report(xml_text)
+    report["output"] = output
+    return report
+
+
+def _run_shard_cold(test_files):
+    """
+    Runs a shard in a brand-new pytest process.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        xml_path = os.path.join(tmp_dir, "report.xml")
+        command = [sys.executable, "-m", "pytest", *test_files, "-q",
+                   "-p", "no:cacheprovider", f"--junitxml={xml_path}"]
+        start = time.perf_counter()
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=TEST_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            return {**_timeout_report(test_files), "seconds": time.perf_counter() - start}
+
+        xml_text = None
+        if os.path.exists(xml_path):
+            with open(xml_path, "r", encoding="utf-8") as f:
+                xml_text = f.read()
+        report = _build_report(test_files, xml_text, result.stdout + result.stderr)
+        report["seconds"] = time.perf_counter() - start
+        return report
+
+
+def _run_shard_warm(pool, test_files):
+    """
+    Runs a shard in a warm worker, falling back to a cold process if the worker dies.
+    """
+    start = time.perf_counter()
+    try:
+        result = pool.run(test_files, TEST_TIMEOUT)
+    except WorkerCrashed:
+        return _run_shard_cold(test_files)
+    if result is None:
+        report = _timeout_report(test_files)
+    else:
+        report = _build_report(test_files, *result)
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def run_tests(test_files, max_workers=MAX_TEST_WORKERS, target_dir=None):
+    """
+    Runs test files in parallel pytest processes (one shard of files per process)
+    and merges their JUnit reports.
+
+    When target_dir is given and its modules can be safely reloaded, the shards
+    go to the warm worker pool instead of fresh pytest processes.
+    """
+    report = {"passed": True, "total": 0, "failed": 0, "skipped": 0, "failures": [], "output": "",
+              "subprocess_seconds": 0.0}
+    if not test_files:
+        return report
+
+    if target_dir is not None and can_reuse_worker(target_dir):
+        worker_pool = get_worker_pool(MAX_TEST_WORKERS)
+        run_shard = lambda shard: _run_shard_warm(worker_pool, shard)
+    else:
+        run_shard = _run_shard_cold
+
+    workers = max(1, min(max_workers, len(test_files)))
+    shards = [test_files[i::workers] for i in range(workers)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for shard_report in pool.map(run_shard, shards):
+            for key in ("total", "failed", "skipped"):
+                report[key] += shard_report[key]
+            report["failures"] += shard_report["failures"]
+            report["subprocess_seconds"] += shard_report["seconds"]
+            report["output"] += shard_report["output"]
+
+    report["passed"] = report["failed"] == 0
+    return report
+
+
+class ReportCache(JsonFileCache):
+    """
+    Test reports persisted between runs, one JSON file per hash of the selected
+    test files and of every Python file of target_dir (which they may import).
+    Only passing reports are kept: a failure is always re-run.
+    """
+
+    def __init__(self, cache_dir=TEST_CACHE_DIR, **limits):
+        super().__init__(cache_dir, **limits)
+
+    def make_key(self, target_dir, test_files):
+        digest = hashlib.sha256()
+        digest.update(f"{sys.version}\0".encode("utf-8"))
+        digest.update("\0".join(sorted(os.path.abspath(t) for t in test_files)).encode("utf-8"))
+        for file_path in sorted(glob.glob(os.path.join(target_dir, "**", "*.py"), recursive=True)):
+            digest.update(f"\0{os.path.abspath(file_path)}\0".encode("utf-8"))
+            with open(file_path, "rb") as f:
+                digest.update(f.read())
+        return digest.hexdigest()
+
+
+_test_cache = ReportCache()
+
+
+def run_affected_tests(target_dir, changed_file, max_workers=MAX_TEST_WORKERS, use_cache=False):
+    """
+    Selects the tests affected by changed_file and runs them.
+    With use_cache, a passing report of the exact same code is reused without running pytest.
+    """
+    test_files = find_affected_tests(target_dir, changed_file)
+    key = _test_cache.make_key(target_dir, test_files) if use_cache and test_files else None
+    cached = _test_cache.get(key) if key else None
+    if cached is not None:
+        return {**cached, "subprocess_seconds": 0.0, "cached": True}
+
+    report = run_tests(test_files, max_workers=max_workers, target_dir=target_dir)
+    report["test_files"] = test_files
+    if key and report["passed"]:
+        _test_cache.put(key, report)
+    return report
+
+
+def format_failures(report):
+    """
+    Human readable summary of the failures, given back to the Fixer.
+    """
+    lines = [f"{report['failed']} of {report['total']} tests failed."]
+    for failure in report["failures"]:
+        lines.append(f"\n[{failure['kind'].upper()}] {failure['test']}: {failure['message']}")
+        if failure["details"]:
+            lines.append(failure["details"])
+    return "\n".join(lines)
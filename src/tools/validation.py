@@ -0,0 +1,77 @@
+import ast
+
+
+class ValidationError(Exception):
+    """A candidate fix is rejected before it is written, linted or tested."""
+
+
+def _defined_names(statements):
+    for node in statements:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            yield node.name
+        elif isinstance(node, (ast.If, ast.Try, ast.With)):
+            # Conditional definitions (try: import ... except ImportError: def ...)
+            for body in ("body", "orelse", "finalbody"):
+                yield from _defined_names(getattr(node, body, []))
+            for handler in getattr(node, "handlers", []):
+                yield from _defined_names(handler.body)
+
+
+def _bound_names(tree):
+    # Names bound at the top level by assignments and imports
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                for name in ast.walk(target):
+                    if isinstance(name, ast.Name):
+                        yield name.id
+        elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+            yield node.target.id
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                yield alias.asname or alias.name.split(".")[0]
+
+
+def _declared_all(tree):
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "__all__" for t in node.targets)
+                and isinstance(node.value, (ast.List, ast.Tuple))):
+            return {e.value for e in node.value.elts if isinstance(e, ast.Constant) and isinstance(e.value, str)}
+    return set()
+
+
+def public_symbols(tree):
+    """
+    Public functions and classes defined at the top level of a module, plus the
+    names listed in __all__ (what tests and other modules can import).
+    Other module variables are left out: renaming them (e.g. to UPPER_CASE
+    constants) is a usual pylint fix.
+    """
+    defined = {name for name in _defined_names(tree.body) if not name.startswith("_")}
+    return defined | _declared_all(tree)
+
+
+def validate_candidate(original_code, candidate_code, filename="<candidate>"):
+    """
+    In-process checks of a candidate (microseconds, no subprocess): it must parse,
+    compile, and still define every public name of the original module.
+    Raises ValidationError with a message meant to be given back to the Fixer.
+    """
+    try:
+        tree = ast.parse(candidate_code, filename)
+        compile(tree, filename, "exec")
+    except SyntaxError as e:
+        raise ValidationError(f"The code is not valid Python (line {e.lineno}: {e.msg}).") from e
+    except ValueError as e:  # e.g. null bytes in the source
+        raise ValidationError(f"The code cannot be compiled ({e}).") from e
+
+    try:
+        original_tree = ast.parse(original_code)
+    except SyntaxError:
+        # A broken original has no reliable symbol list to preserve
+        return
+    # An original function may now be provided by an alias or an import
+    provided = set(_defined_names(tree.body)) | set(_bound_names(tree))
+    missing = sorted(public_symbols(original_tree) - provided)
+    if missing:
+        raise ValidationError(f"Public names of the original module were removed: {', '.join(missing)}.")
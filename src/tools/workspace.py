@@ -0,0 +1,114 @@
+import glob
+import os
+import shutil
+import tempfile
+
+from src.tools.code_tools import write_file_safely
+
+# Never cloned: caches and logs rebuilt or written by the tools, version control
+IGNORED_NAMES = {"__pycache__", ".pytest_cache", ".mypy_cache", ".ruff_cache", ".tox", ".nox", ".git",
+                 ".swarm_cache", "node_modules"}
+# Skipped unless they hold Python modules (a package may be called logs)
+DATA_DIRS = {"logs"}
+
+# Data files up to this size are copied (tests may write them in place); larger
+# ones are hard-linked like the sources
+MAX_COPIED_BYTES = 1024 * 1024
+
+
+def _ignored(directory, names):
+    ignored = set()
+    for name in names:
+        path = os.path.join(directory, name)
+        if (name in IGNORED_NAMES
+                # Virtual environments (a pyvenv.cfg at their root) are never cloned either
+                or os.path.isfile(os.path.join(path, "pyvenv.cfg"))
+                or (name in DATA_DIRS and os.path.isdir(path) and not glob.glob(os.path.join(path, "*.py")))):
+            ignored.add(name)
+    return ignored
+
+
+def _link_or_copy(src, dst):
+    # Python sources are only ever replaced (write_file_safely), never written in
+    # place, so linking them is safe. Small data files get a real copy
+    if not src.endswith(".py") and os.path.getsize(src) <= MAX_COPIED_BYTES:
+        return shutil.copy2(src, dst)
+    # A hard link costs no data copy; across filesystems we fall back to a real copy
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
+
+class Workspace:
+    """
+    Scratch clone of a target directory, for trying changes without touching the
+    user's files.
+
+    Python files are hard-linked into the clone rather than copied, so cloning
+    costs one directory entry per source file. Writes go through write()
+    (write_file_safely), which replaces the file instead of writing into it: the
+    link is broken and the original never changes. Small data files (test data,
+    config) are copied, since tests may modify them in place; large ones are
+    linked too. Caches, logs, version control and virtual environments are left out.
+
+    snapshot()/rollback() restore the files written since a snapshot, so one
+    workspace can be reused for several attempts; promote() copies files back to
+    the real target directory.
+    """
+
+    def __init__(self, target_dir, root=None):
+        self.target_dir = os.path.abspath(target_dir)
+        self._root = tempfile.mkdtemp(prefix="swarm-workspace-", dir=root)
+        self.path = os.path.join(self._root, os.path.basename(self.target_dir))
+        shutil.copytree(self.target_dir, self.path, ignore=_ignored, copy_function=_link_or_copy)
+        # Files written in the clone since it was created (relative paths)
+        self._written = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def file_path(self, rel_path):
+        return os.path.join(self.path, rel_path)
+
+    def read(self, rel_path):
+        with open(self.file_path(rel_path), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def write(self, rel_path, content):
+        write_file_safely(self.path, rel_path, content)
+        self._written.add(os.path.normpath(rel_path))
+
+    def snapshot(self):
+        """
+        Content of every file written so far (files never written are still the originals).
+        """
+        return {rel_path: self.read(rel_path) for rel_path in self._written}
+
+    def rollback(self, snapshot):
+        """
+        Puts the workspace back in the state of `snapshot`.
+        """
+        for rel_path in self._written - set(snapshot):
+            clone_path = self.file_path(rel_path)
+            original = os.path.join(self.target_dir, rel_path)
+            os.remove(clone_path)
+            if os.path.exists(original):
+                _link_or_copy(original, clone_path)
+        for rel_path, content in snapshot.items():
+            write_file_safely(self.path, rel_path, content)
+        self._written = set(snapshot)
+
+    def promote(self, rel_paths=None):
+        """
+        Copies the given files (by default every file written) back to the target directory.
+        """
+        for rel_path in sorted(rel_paths or self._written):
+            write_file_safely(self.target_dir, rel_path, self.read(rel_path))
+
+    def close(self):
+        shutil.rmtree(self._root, ignore_errors=True)
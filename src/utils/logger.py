@@ -1,11 +1,28 @@
+import atexit
+import glob
 import json
 import os
+import queue
+import threading
+import time
 import uuid
 from datetime import datetime
 from enum import Enum
 
-# Chemin du fichier de logs
-LOG_FILE = os.path.join("logs", "experiment_data.json")
+# Chemin du fichier de logs (JSON Lines : une entrée JSON par ligne, en ajout seul)
+LOG_FILE = os.path.join("logs", "experiment_data.jsonl")
+
+# Rotation : au-delà de MAX_LOG_BYTES, le fichier devient .1 (puis .2, ...)
+MAX_LOG_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+
+# Les entrées sont écrites par lots : toutes les FLUSH_EVERY entrées ou FLUSH_INTERVAL secondes
+FLUSH_EVERY = 20
+FLUSH_INTERVAL = 2.0
+
+# File d'attente de la télémétrie : au-delà, les entrées sont abandonnées (et comptées)
+# plutôt que de bloquer les nœuds du graphe
+SINK_QUEUE_SIZE = 10000
 
 class ActionType(str, Enum):
     """
@@ -16,6 +33,216 @@ class ActionType(str, Enum):
     DEBUG = "DEBUG"             # Analyse d'erreurs d'exécution
     FIX = "FIX"                 # Application de correctifs
 
+class JsonlWriter:
+    """
+    Écrivain JSON Lines en ajout seul, avec tampon et rotation par taille.
+    Le coût d'une écriture ne dépend pas du nombre d'entrées déjà enregistrées.
+    """
+
+    def __init__(self, path=LOG_FILE, max_bytes=MAX_LOG_BYTES, backups=LOG_BACKUPS,
+                 flush_every=FLUSH_EVERY, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def write(self, entry):
+        self.write_line(json.dumps(entry, ensure_ascii=False))
+
+    def write_line(self, line):
+        with self._lock:
+            self._buffer.append(line)
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+            if len(self._buffer) >= self.flush_every or due:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(self._buffer) + "\n")
+        self._buffer = []
+        if os.path.getsize(self.path) >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        # experiment_data.jsonl -> .1, .1 -> .2, ... ; la plus ancienne sauvegarde est supprimée
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+def shard_path(path=LOG_FILE, pid=None):
+    """
+    Fichier propre à un processus (logs/experiment_data.<pid>.jsonl) : plusieurs
+    processus peuvent écrire en même temps sans verrou de fichier.
+    """
+    base, ext = os.path.splitext(path)
+    return f"{base}.{pid or os.getpid()}{ext}"
+
+
+def _list_shards(path=LOG_FILE):
+    base, ext = os.path.splitext(path)
+    return sorted(glob.glob(f"{base}.*{ext}"))
+
+
+class TelemetrySink:
+    """
+    Écriture de la télémétrie sur un thread d'arrière-plan alimenté par une file bornée.
+    emit() ne fait jamais d'entrée/sortie disque et ne bloque jamais l'appelant.
+    Chaque processus écrit dans son propre fichier, fusionné ensuite par merge_shards().
+    """
+
+    _STOP = object()
+
+    def __init__(self, path=LOG_FILE, maxsize=SINK_QUEUE_SIZE):
+        self.path = path
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Après un fork, le thread du parent n'existe pas dans l'enfant : on en relance un
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(self.maxsize)
+            # Pas de rotation : un fichier par processus, de courte durée de vie
+            self._writer = JsonlWriter(shard_path(self.path), max_bytes=float("inf"))
+            self._thread = threading.Thread(target=self._run, name="telemetry-sink", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def emit(self, entry):
+        # Sérialisée ici, dans le thread de l'appelant : une entrée invalide lève
+        # TypeError chez lui, et une modification ultérieure du dict n'a pas d'effet
+        line = json.dumps(entry, ensure_ascii=False)
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            try:
+                line = self._queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                self._flush_writer()
+                continue
+            try:
+                if line is self._STOP:
+                    self._flush_writer()
+                    return
+                self._writer.write_line(line)
+            except Exception as e:
+                # Aucune entrée ne doit arrêter le thread : flush() attendrait indéfiniment
+                print(f"⚠️ Télémétrie : écriture impossible ({e}).")
+            finally:
+                self._queue.task_done()
+
+    def _flush_writer(self):
+        try:
+            self._writer.flush()
+        except Exception as e:
+            print(f"⚠️ Télémétrie : écriture impossible ({e}).")
+
+    def flush(self):
+        """
+        Attend que toutes les entrées en file soient écrites sur le disque.
+        """
+        if self._pid != os.getpid():
+            return
+        self._queue.join()
+        self._writer.flush()
+
+    def close(self):
+        if self._pid != os.getpid():
+            return
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self._pid = None
+        if self.dropped:
+            print(f"⚠️ Télémétrie : {self.dropped} entrées abandonnées (file pleine).")
+
+
+def merge_shards(path=LOG_FILE, pids=None):
+    """
+    Ajoute au journal principal les fichiers des processus `pids` (par défaut le
+    processus courant) puis les supprime. À appeler une fois que ces processus ont
+    fini d'écrire : les fichiers des autres processus (une autre exécution en
+    cours, par exemple) ne sont pas touchés.
+    """
+    _sink.flush()
+    writer = JsonlWriter(path)
+    for pid in sorted(set(pids or [os.getpid()])):
+        shard = shard_path(path, pid)
+        if not os.path.exists(shard):
+            continue
+        with open(shard, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    writer.write_line(line.rstrip("\n"))
+        writer.flush()
+        os.remove(shard)
+
+
+def read_experiments(path=LOG_FILE):
+    """
+    Parcourt les entrées enregistrées, des plus anciennes aux plus récentes
+    (fichiers de rotation et fichiers des processus non encore fusionnés compris),
+    sans charger tout le fichier en mémoire.
+    Une ligne corrompue est signalée et ignorée, les autres restent lisibles.
+    """
+    _sink.flush()
+    rotated = []
+    i = 1
+    while os.path.exists(f"{path}.{i}"):
+        rotated.append(f"{path}.{i}")
+        i += 1
+
+    for file_path in [*reversed(rotated), path, *_list_shards(path)]:
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️ Attention : ligne {line_number} corrompue ignorée dans {file_path}.")
+
+
+_sink = TelemetrySink()
+atexit.register(_sink.close)
+
+
+def get_sink():
+    """
+    Retourne le puits de télémétrie partagé du processus.
+    """
+    return _sink
+
+
 def log_experiment(agent_name: str, model_used: str, action: ActionType, details: dict, status: str):
     """
     Enregistre une interaction d'agent pour l'analyse scientifique.
@@ -56,9 +283,6 @@ def log_experiment(agent_name: str, model_used: str, action: ActionType, details
             )
 
     # --- 3. PRÉPARATION DE L'ENTRÉE ---
-    # Création du dossier logs s'il n'existe pas
-    os.makedirs("logs", exist_ok=True)
-    
     entry = {
         "id": str(uuid.uuid4()),  # ID unique pour éviter les doublons lors de la fusion des données
         "timestamp": datetime.now().isoformat(),
@@ -69,21 +293,7 @@ def log_experiment(agent_name: str, model_used: str, action: ActionType, details
         "status": status
     }
 
-    # --- 4. LECTURE & ÉCRITURE ROBUSTE ---
-    data = []
-    if os.path.exists(LOG_FILE):
-        try:
-            with open(LOG_FILE, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                if content: # Vérifie que le fichier n'est pas juste vide
-                    data = json.loads(content)
-        except json.JSONDecodeError:
-            # Si le fichier est corrompu, on repart à zéro (ou on pourrait sauvegarder un backup)
-            print(f"⚠️ Attention : Le fichier de logs {LOG_FILE} était corrompu. Une nouvelle liste a été créée.")
-            data = []
-
-    data.append(entry)
-    
-    # Écriture
-    with open(LOG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
\ No newline at end of file
+    # --- 4. ÉCRITURE EN ARRIÈRE-PLAN ---
+    # Sérialisée immédiatement (TypeError si un détail n'est pas JSON), puis mise en file ;
+    # le thread de télémétrie l'ajoute au fichier par lots
+    _sink.emit(entry)
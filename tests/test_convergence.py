@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.convergence import AdaptivePolicy, FixedThresholdPolicy, get_policy, is_oscillating
+
+
+def step(score, previous_score=None, failed=0, seconds=6, tokens=1000):
+    return {"score": score, "previous_score": previous_score, "failed": failed,
+            "seconds": seconds, "tokens": tokens}
+
+
+def make_state(score, previous_score=None, trajectory=None, loop_count=1, report="Tests: OK"):
+    return {
+        "current_pylint_score": score,
+        "previous_pylint_score": previous_score,
+        "messages": [SimpleNamespace(content=report)],
+        "loop_count": loop_count,
+        "trajectory": trajectory or [],
+    }
+
+
+def old_should_continue(state):
+    # Stopping rules of the graph before convergence policies existed
+    if "FAIL" in state["messages"][-1].content:
+        return "fixer"
+    if state["loop_count"] >= 10:
+        return "end"
+    if state["current_pylint_score"] >= 9.5:
+        return "end"
+    prev_score = state.get("previous_pylint_score")
+    if prev_score is not None and state["current_pylint_score"] == prev_score:
+        return "end"
+    return "fixer"
+
+
+def test_alternating_outcomes_oscillate():
+    trajectory = [step(6.0, 5.0), step(7.0, 6.0, failed=1), step(6.0, 7.0), step(7.0, 6.0, failed=1)]
+    assert is_oscillating(trajectory)
+
+
+def test_three_identical_outcomes_oscillate():
+    assert is_oscillating([step(4.0), step(6.0, 4.0), step(6.0, 6.0), step(6.0, 6.0)])
+
+
+def test_steady_progress_does_not_oscillate():
+    assert not is_oscillating([step(5.0), step(6.0, 5.0), step(7.0, 6.0), step(8.0, 7.0)])
+    assert not is_oscillating([step(6.0), step(7.0, 6.0)])
+
+
+def test_expected_gain_is_capped_by_points_left():
+    policy = AdaptivePolicy()
+    assert policy.expected_gain([step(6.0, 3.0), step(9.0, 6.0)]) == pytest.approx(1.0)
+    assert policy.expected_gain([step(9.0)]) is None
+
+
+def test_adaptive_policy_stops_when_gain_is_too_slow():
+    policy = AdaptivePolicy(min_gain_per_minute=0.2)
+    # +0.1 per iteration of one minute each
+    trajectory = [step(7.0, 6.9, seconds=60), step(7.1, 7.0, seconds=60)]
+    decision, reason = policy.decide(make_state(7.1, 7.0, trajectory))
+    assert decision == "end"
+    assert "60s" in reason
+
+
+def test_adaptive_policy_stops_when_gain_costs_too_many_tokens():
+    policy = AdaptivePolicy(min_gain_per_1k_tokens=0.05)
+    # +0.5 per iteration of 20k tokens each
+    trajectory = [step(7.0, 6.5, tokens=20000), step(7.5, 7.0, tokens=20000)]
+    decision, reason = policy.decide(make_state(7.5, 7.0, trajectory))
+    assert decision == "end"
+    assert "20000 tokens" in reason
+
+
+def test_adaptive_policy_continues_while_gain_is_worth_it():
+    trajectory = [step(6.0, 5.0), step(7.0, 6.0)]
+    assert AdaptivePolicy().decide(make_state(7.0, 6.0, trajectory))[0] == "fixer"
+
+
+def test_adaptive_policy_stops_oscillation_even_with_failing_tests():
+    trajectory = [step(6.0, 5.0, failed=1), step(7.0, 6.0), step(6.0, 7.0, failed=1), step(7.0, 6.0)]
+    state = make_state(7.0, 6.0, trajectory, report="Tests: FAIL")
+    assert AdaptivePolicy().decide(state)[0] == "end"
+
+
+@pytest.mark.parametrize("state", [
+    make_state(5.0, report="Tests: FAIL test_add"),
+    make_state(5.0, loop_count=10),
+    make_state(9.6, 8.0),
+    make_state(7.0, 7.0),
+    make_state(7.0, 6.0),
+    make_state(7.0),
+    make_state(9.5, 9.5, loop_count=10, report="FAIL"),
+])
+def test_fixed_policy_matches_old_should_continue(state):
+    assert FixedThresholdPolicy().decide(state)[0] == old_should_continue(state)
+
+
+def test_get_policy_rejects_unknown_name():
+    assert isinstance(get_policy({"policy": "fixed"}), FixedThresholdPolicy)
+    with pytest.raises(ValueError, match="Unknown convergence policy"):
+        get_policy({"policy": "nope"})
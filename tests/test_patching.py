@@ -0,0 +1,155 @@
+import pytest
+
+from src.tools.patching import PatchError, apply_fixer_output, apply_function_patches, apply_unified_diff
+
+ORIGINAL = '''"""Basic arithmetic helpers."""
+import math
+
+LIMIT = 10
+
+
+def add(a, b):
+    return a - b
+
+
+def divide(a, b):
+    return a / b
+'''
+
+
+def test_function_patch_replaces_definition_in_place():
+    result = apply_function_patches(ORIGINAL, "def add(a, b):\n    return a + b\n")
+    assert "return a + b" in result
+    assert "return a - b" not in result
+    assert result.index("def add") < result.index("def divide")
+
+
+def test_function_patch_appends_new_definition():
+    result = apply_function_patches(ORIGINAL, "def mul(a, b):\n    return a * b\n")
+    assert result.rstrip().endswith("return a * b")
+    assert "def add(a, b):\n    return a - b" in result
+
+
+def test_function_patch_keeps_decorators_together():
+    original = "import functools\n\n\n@functools.lru_cache\ndef f():\n    return 1\n"
+    result = apply_function_patches(original, "@functools.cache\ndef f():\n    return 2\n")
+    assert "lru_cache" not in result
+    assert result.count("def f") == 1
+
+
+def test_function_patch_adds_only_new_imports_after_existing_ones():
+    result = apply_function_patches(ORIGINAL, "import math\nimport os\n\n\ndef add(a, b):\n    return a + b\n")
+    assert result.count("import math") == 1
+    assert result.index("import math") < result.index("import os") < result.index("LIMIT")
+
+
+def test_function_patch_replaces_module_docstring():
+    result = apply_function_patches(ORIGINAL, '"""Arithmetic."""\n')
+    assert result.startswith('"""Arithmetic."""\n')
+    assert "Basic arithmetic helpers" not in result
+
+
+def test_function_patch_puts_new_docstring_before_new_imports():
+    patch = '"""Module doc."""\nimport os\n\n\ndef f():\n    return os.sep\n'
+    result = apply_function_patches("def f():\n    return 1\n", patch)
+    assert result.startswith('"""Module doc."""\n')
+    assert result.index('"""Module doc."""') < result.index("import os") < result.index("def f")
+
+
+def test_function_patch_replaces_top_level_assignment():
+    result = apply_function_patches(ORIGINAL, "LIMIT = 20\n")
+    assert "LIMIT = 20" in result
+    assert "LIMIT = 10" not in result
+    assert result.index("LIMIT = 20") < result.index("def add")
+
+
+def test_function_patch_rejects_invalid_patch():
+    with pytest.raises(PatchError):
+        apply_function_patches(ORIGINAL, "def add(a, b)\n    return a + b\n")
+
+
+def test_unified_diff_applies_hunk():
+    diff = "--- a/m.py\n+++ b/m.py\n@@ -7,2 +7,2 @@\n def add(a, b):\n-    return a - b\n+    return a + b\n"
+    result = apply_unified_diff(ORIGINAL, diff)
+    assert "return a + b" in result
+    assert "return a - b" not in result
+
+
+def test_unified_diff_locates_hunk_with_wrong_line_numbers():
+    diff = "@@ -1,2 +1,2 @@\n def divide(a, b):\n-    return a / b\n+    return a / b if b else 0.0\n"
+    result = apply_unified_diff(ORIGINAL, diff)
+    assert "return a / b if b else 0.0" in result
+
+
+def test_unified_diff_applies_several_hunks():
+    diff = ("@@ -4,1 +4,1 @@\n-LIMIT = 10\n+LIMIT = 20\n"
+            "@@ -8,1 +8,1 @@\n-    return a - b\n+    return a + b\n")
+    result = apply_unified_diff(ORIGINAL, diff)
+    assert "LIMIT = 20" in result
+    assert "return a + b" in result
+
+
+def test_unified_diff_rejects_unmatched_hunk():
+    diff = "@@ -1,1 +1,1 @@\n-nothing like this\n+x = 1\n"
+    with pytest.raises(PatchError, match="Hunk #1"):
+        apply_unified_diff(ORIGINAL, diff)
+
+
+def test_unified_diff_without_hunk_is_rejected():
+    with pytest.raises(PatchError):
+        apply_unified_diff(ORIGINAL, "--- a/m.py\n+++ b/m.py\n")
+
+
+def test_unified_diff_rejects_invalid_result():
+    diff = "@@ -8,1 +8,1 @@\n-    return a - b\n+    return (a + b\n"
+    with pytest.raises(PatchError, match="not valid Python"):
+        apply_unified_diff(ORIGINAL, diff)
+
+
+def test_fixer_output_dispatches_on_block_kind():
+    as_diff = "```diff\n@@ -8,1 +8,1 @@\n-    return a - b\n+    return a + b\n```"
+    as_functions = "```python\ndef add(a, b):\n    return a + b\n```"
+    assert apply_fixer_output(ORIGINAL, as_diff) == apply_fixer_output(ORIGINAL, as_functions)
+
+
+SCRIPT = '''"""Script."""
+A, B = 1, 2
+
+
+def run():
+    return A + B
+
+
+if __name__ == "__main__":
+    print(run())
+'''
+
+
+def test_function_patch_replaces_main_block():
+    patch = 'if __name__ == "__main__":\n    print(run() * 2)\n'
+    result = apply_function_patches(SCRIPT, patch)
+    assert result.count('if __name__ == "__main__":') == 1
+    assert "print(run() * 2)" in result
+    assert "print(run())\n" not in result
+
+
+def test_function_patch_replaces_tuple_assignment():
+    result = apply_function_patches(SCRIPT, "A, B = 3, 4\n")
+    assert "A, B = 3, 4" in result
+    assert "A, B = 1, 2" not in result
+    assert result.index("A, B = 3, 4") < result.index("def run")
+
+
+def test_function_patch_inserts_new_definitions_before_main_block():
+    result = apply_function_patches(SCRIPT, "LIMIT = 5\n\n\ndef stop():\n    return LIMIT\n")
+    assert result.index("LIMIT = 5") < result.index("def stop") < result.index("if __name__")
+
+
+def test_function_patch_rejects_unplaceable_statement():
+    with pytest.raises(PatchError, match="top-level statement"):
+        apply_function_patches(SCRIPT, "print(run() + 1)\n")
+
+
+def test_function_patch_rejects_partial_reassignment():
+    with pytest.raises(PatchError):
+        apply_function_patches(SCRIPT, "A = 3\n")
@@ -0,0 +1,68 @@
+import os
+
+from src.tools.pytest_runner import find_affected_tests, parse_junit_report
+
+
+def write(root, rel_path, content=""):
+    path = root / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+    return str(path)
+
+
+def names(paths):
+    return sorted(os.path.basename(p) for p in paths)
+
+
+def test_affected_tests_follow_transitive_imports(tmp_path):
+    core = write(tmp_path, "pkg/core.py", "def f():\n    return 1\n")
+    write(tmp_path, "pkg/__init__.py")
+    write(tmp_path, "pkg/helpers.py", "from pkg.core import f\n")
+    write(tmp_path, "test_helpers.py", "import pkg.helpers\n")
+    write(tmp_path, "test_other.py", "import json\n")
+    assert names(find_affected_tests(str(tmp_path), core)) == ["test_helpers.py"]
+
+
+def test_affected_tests_match_short_module_names(tmp_path):
+    # Tests run with their directory on sys.path import "calc", not "src.calc"
+    calc = write(tmp_path, "src/calc.py", "def add(a, b):\n    return a + b\n")
+    write(tmp_path, "tests/test_calc.py", "from calc import add\n")
+    write(tmp_path, "tests/test_misc.py", "import calculator\n")
+    assert names(find_affected_tests(str(tmp_path), calc)) == ["test_calc.py"]
+
+
+def test_affected_tests_survive_import_cycles(tmp_path):
+    a = write(tmp_path, "a.py", "import b\n")
+    write(tmp_path, "b.py", "import a\n")
+    write(tmp_path, "test_b.py", "import b\n")
+    assert names(find_affected_tests(str(tmp_path), a)) == ["test_b.py"]
+
+
+JUNIT = """<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="pytest" tests="4">
+  <testcase classname="test_calc" name="test_ok" time="0.001"/>
+  <testcase classname="test_calc" name="test_wrong" time="0.001">
+    <failure message="assert 1 == 2">def test_wrong(): assert 1 == 2</failure>
+  </testcase>
+  <testcase classname="test_calc" name="test_broken" time="0.001">
+    <error message="failed on setup with &quot;fixture 'db' not found&quot;">E fixture 'db' not found</error>
+  </testcase>
+  <testcase classname="test_calc" name="test_later" time="0.000">
+    <skipped type="pytest.skip" message="not ready">skipped</skipped>
+  </testcase>
+</testsuite></testsuites>
+"""
+
+
+def test_junit_report_counts_outcomes():
+    report = parse_junit_report(JUNIT)
+    assert (report["total"], report["failed"], report["skipped"]) == (4, 2, 1)
+
+
+def test_junit_report_separates_errors_from_failures():
+    failures = {f["test"]: f for f in parse_junit_report(JUNIT)["failures"]}
+    assert failures["test_calc::test_wrong"]["kind"] == "failure"
+    assert failures["test_calc::test_wrong"]["message"] == "assert 1 == 2"
+    assert failures["test_calc::test_broken"]["kind"] == "error"
+    assert "fixture 'db' not found" in failures["test_calc::test_broken"]["details"]
+    assert "test_calc::test_later" not in failures